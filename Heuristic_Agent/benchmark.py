@@ -0,0 +1,158 @@
+import os, sys
+import argparse
+import io, contextlib
+import json
+import subprocess
+import chess
+
+from chess_minimax import ChessMinimax
+from instrumentation import SearchStats
+
+# Benchmarks ChessMinimax at a fixed depth over a fixed set of positions
+# 	python benchmark.py -d 3 -o baseline.json -l before   # save a baseline, labelled (by default with the git commit)
+# 	python benchmark.py -d 3 -b baseline.json             # compare the current tree against it
+# Each position is searched with a fresh transposition table so results don't depend on the order they run in.
+
+PUZZLE_LIST = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cpp-chess", "tests", "puzzle_tests", "puzzles.list")
+
+OPENINGS = [
+	("start", chess.STARTING_FEN),
+	("open game", "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3"),
+	("sicilian", "rnbqkbnr/pp1ppppp/8/2p5/4P3/8/PPPP1PPP/RNBQKBNR w KQkq c6 0 2"),
+	("queens gambit", "rnbqkbnr/ppp1pppp/8/3p4/2PP4/8/PP2PPPP/RNBQKBNR b KQkq c3 0 2"),
+]
+
+MIDDLEGAMES = [
+	("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"),
+	("perft 4", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1"),
+	("perft 5", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8"),
+	("perft 6", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10"),
+	("endgame", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1"),
+]
+
+# returns [(<set>, <name>, <fen>, <expected best move or None>)]
+def positions(sets, num_puzzles) :
+	res = []
+	if "openings" in sets :
+		res += [("openings", name, fen, None) for name, fen in OPENINGS]
+	if "middlegames" in sets :
+		res += [("middlegames", name, fen, None) for name, fen in MIDDLEGAMES]
+	if "test_cases" in sets :
+		sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "test"))
+		with contextlib.redirect_stdout(io.StringIO()) :
+			from test_cases import TestCase, TupleTestCase
+		fens = []
+		for test in TestCase.all_tests :
+			if isinstance(test, TupleTestCase) and test.fen and test.fen not in fens :
+				fens.append(test.fen)
+		res += [("test_cases", f"test case {i+1}", fen, None) for i, fen in enumerate(fens)]
+	if "puzzles" in sets :
+		with open(PUZZLE_LIST) as f :
+			lines = [line.strip() for line in f if line.strip()]
+		for i in range(0, min(len(lines), 2 * num_puzzles), 2) :
+			# the first move of the solution is played by the other side, the search should find the second
+			board = chess.Board(lines[i])
+			solution = lines[i+1].split()
+			board.push_uci(solution[0])
+			res.append(("puzzles", f"puzzle {i//2+1}", board.fen(), solution[1]))
+	return res
+
+def run(position_set, depth, options) :
+	results = []
+	for (set_name, name, fen, expected) in position_set :
+		board = chess.Board(fen)
+		stats = SearchStats()
+		with contextlib.redirect_stdout(io.StringIO()) :
+			minimax = ChessMinimax(board, depth, color=board.turn, instrument=stats, **options)
+		record = stats.records[0]
+		results.append({
+			"set": set_name,
+			"name": name,
+			"fen": fen,
+			"depth": depth,
+			"nodes": record["nodes"] + minimax.num_q_evaled,
+			"num_evaled": minimax.num_evaled,
+			"time": minimax.search_time,
+			"nodes_per_second": (record["nodes"] + minimax.num_q_evaled) / minimax.search_time if minimax.search_time else None,
+			"time_to_depth": [it["time"] for it in record["iterations"]],
+			"best_move": str(minimax.best_choice),
+			"eval": minimax.best_quality.packed,
+			"expected": expected,
+		})
+		print(f"{set_name:12} {name:16} nodes = {results[-1]['nodes']:8} time = {minimax.search_time:7.3f}s best move = {minimax.best_choice}{'' if expected is None else (' (solved)' if str(minimax.best_choice) == expected else f' (expected {expected})')}")
+	return results
+
+def summary(results) :
+	nodes = sum(r["nodes"] for r in results)
+	time = sum(r["time"] for r in results)
+	puzzles = [r for r in results if r["expected"] is not None]
+	return {
+		"positions": len(results),
+		"nodes": nodes,
+		"time": time,
+		"nodes_per_second": nodes / time if time else None,
+		"puzzles": len(puzzles),
+		"puzzles_solved": sum(r["best_move"] == r["expected"] for r in puzzles),
+	}
+
+def commit() :
+	try :
+		return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+	except (OSError, subprocess.CalledProcessError) :
+		return None
+
+def percent(new, old) :
+	return f"{round(new / old * 10000) / 100}%" if old else "nil"
+
+# baseline is the json written by -o and path the file it was read from
+def compare(results, baseline, path) :
+	old = {(r["set"], r["fen"], r["depth"]) : r for r in baseline["results"]}
+	matched = [(r, old[(r["set"], r["fen"], r["depth"])]) for r in results if (r["set"], r["fen"], r["depth"]) in old]
+	if not matched :
+		print("No positions in common with the baseline")
+		return
+	agree = 0
+	for (new, prev) in matched :
+		if new["best_move"] == prev["best_move"] :
+			agree += 1
+		else :
+			print(f"best move changed: {new['set']} {new['name']} {prev['best_move']} ({prev['eval']}) -> {new['best_move']} ({new['eval']})")
+	nodes, prev_nodes = sum(n["nodes"] for n, _ in matched), sum(p["nodes"] for _, p in matched)
+	time, prev_time = sum(n["time"] for n, _ in matched), sum(p["time"] for _, p in matched)
+	label = baseline.get("label") or baseline.get("commit")
+	print(f"compared with baseline {path}{f' ({label})' if label else ''} on {len(matched)} positions:")
+	print(f"\tnodes = {nodes} vs {prev_nodes} ({percent(nodes, prev_nodes)})")
+	print(f"\ttime = {round(time, 3)}s vs {round(prev_time, 3)}s ({percent(time, prev_time)})")
+	print(f"\tnodes/sec = {round(nodes / time) if time else 'nil'} vs {round(prev_nodes / prev_time) if prev_time else 'nil'}")
+	print(f"\tbest move agreement = {agree}/{len(matched)} ({percent(agree, len(matched))})")
+
+
+if __name__ == "__main__" :
+
+	parser = argparse.ArgumentParser(description='ChessMinimax benchmark')
+	parser.add_argument('-d', '-depth', dest='depth', type = int, action='store', default=3)
+	parser.add_argument('-s', '-sets', dest='sets', action='store', nargs = '*', default=["openings", "middlegames", "test_cases", "puzzles"])
+	parser.add_argument('-n', '-puzzles', dest='num_puzzles', type = int, action='store', default=20) # number of puzzles from puzzles.list
+	parser.add_argument('-o', '-out', dest='out', action='store', default=None) # write results to json
+	parser.add_argument('-l', '-label', dest='label', action='store', default=None) # label saved with -o results, shown when they're compared against
+	parser.add_argument('-b', '-baseline', dest='baseline', action='store', default=None) # compare against results written by -o
+	parser.add_argument('-q', '-quiescence', dest='quiescence', action='store_true')
+	parser.add_argument('-pvs', dest='pvs', action='store_true')
+	args = parser.parse_args()
+
+	options = dict(quiescence=args.quiescence, pvs=args.pvs)
+	results = run(positions(args.sets, args.num_puzzles), args.depth, options)
+	total = summary(results)
+	print()
+	print(f"{total['positions']} positions, nodes = {total['nodes']}, time = {round(total['time'], 3)}s, nodes/sec = {round(total['nodes_per_second']) if total['nodes_per_second'] else 'nil'}")
+	if total["puzzles"] :
+		print(f"puzzles solved = {total['puzzles_solved']}/{total['puzzles']}")
+
+	if args.baseline :
+		print()
+		with open(args.baseline) as f :
+			compare(results, json.load(f), args.baseline)
+
+	if args.out :
+		with open(args.out, "w") as f :
+			json.dump({"label": args.label, "commit": commit(), "depth": args.depth, "options": options, "summary": total, "results": results}, f, indent=1)
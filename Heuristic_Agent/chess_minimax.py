@@ -1,20 +1,46 @@
 
 import chess
 from minimax import Minimax
-from eval import get_eval
+from eval import static_eval, piece_values
+import score
 from score import Score
-from transposition_table import TranspositionTable
+from transposition_table import TranspositionTable, EXACT
+from move_ordering import MoveOrderer
+import zobrist
+
+DELTA_MARGIN = 2 # positional swing allowed on top of material won when delta pruning in quiescence search
 
 class ChessMinimax(Minimax) :
-	def __init__(self, board, depth, timeout = None, color=chess.WHITE, pruning=True, it_deepening=True, t_table=True, node_ordering=True, verbose=False):
+	def __init__(self, board, depth, timeout = None, alpha = None, beta = None, color=chess.WHITE, pruning=True, it_deepening=True, t_table=True, node_ordering=True, orderer=None, quiescence=False, quiescence_nodes=1000, pvs=False, aspiration=None, root_order=None, deadline=None, stop=None, root_split=None, instrument=None, verbose=False):
 		self.board = board
+		self.keys = [zobrist.zobrist_hash(board)] # zobrist hash of each position on the search path
+		self.legal_moves = (None, None) # (<key>, <legal moves>) generated by the last call to children()
+		self.terminal = False # whether the last call to eval() found the game over
+		self.stop = stop # multiprocessing.Event that interrupts the search once set
+		self.root_split = root_split # RootSplit that searches root choices after the first in other processes
+		self.split_nodes = {} # num_evaled by each root split worker process
+
+		# number of times each position has occurred since the last irreversible move - including the search path
+		self.repetitions = {self.keys[0]: 1}
+		self.repeated = 0 # number of positions that have occurred at least twice
+		history = board.copy()
+		for _ in range(min(board.halfmove_clock, len(board.move_stack))) :
+			history.pop()
+			self.count_position(zobrist.zobrist_hash(history), 1)
 		if t_table == True:
 			self.t_table = TranspositionTable()
 		elif isinstance(t_table, TranspositionTable) :
 			self.t_table = t_table
 		else :
 			self.t_table = None
+		if self.t_table is not None :
+			self.t_table.new_search()
 		self.node_ordering = node_ordering
+		if node_ordering :
+			self.orderer = orderer if orderer is not None else MoveOrderer() # may be kept from earlier searches of the game
+			self.orderer.new_search(board)
+		else :
+			self.orderer = None
 
 		# stats to track
 		if t_table :
@@ -23,96 +49,181 @@ class ChessMinimax(Minimax) :
 			self.records = 0
 			self.lookup_hits = 0
 			self.lookup_miss = 0
-		
-		if t_table and node_ordering :
-			self.internal_node_hits = 0
-			self.internal_node_miss = 0
-		elif node_ordering :
-			self.internal_node_evals = 0
+		self.cutoffs = 0
+		self.first_choice_cutoffs = 0
 
-		Minimax.__init__(self, depth, timeout=timeout, maxing= color==chess.WHITE, pruning=pruning, it_deepening=it_deepening, verbose=verbose)
+		Minimax.__init__(self, depth, timeout=timeout, alpha=alpha, beta=beta, maxing= color==chess.WHITE, pruning=pruning, it_deepening=it_deepening, quiescence=quiescence, quiescence_nodes=quiescence_nodes, pvs=pvs, aspiration=aspiration, root_order=root_order, deadline=deadline, instrument=instrument, verbose=verbose)
+		self.best_quality = Score(self.best_quality) # the search works on packed scores
 		
 	def children(self) :
-		
+		moves = list(self.board.generate_legal_moves())
+		self.legal_moves = (self.keys[-1], moves)
 		if self.node_ordering :
-			move_score_pairs = []
-			for move in self.board.legal_moves :
-				self.board.push(move)
-				###### get score
-				if self.t_table != None :
-					fen = self.board.fen()
-					if (fen, 0) in self.t_table :
-						self.internal_node_hits += 1
-						score = self.t_table[(fen, 0)]
-					else :
-						self.internal_node_miss += 1
-						score = get_eval(self.board)
-						self.t_table[(fen, 0)] = score
-				else :
-					self.internal_node_evals += 1
-					score = get_eval(self.board)
-				###### 
-				move_score_pairs.append((move, score))
-				self.board.pop()
-			move_score_pairs.sort(key = lambda x : x[1], reverse=True)
-			return [ move for move, _ in move_score_pairs ]
+			return self.orderer.order(self.board, moves, self.ply)
 		else :
-			return list(self.board.legal_moves)
+			return list(moves)
+
+	# captures and queen promotions - nothing is searched past a position eval() found to be over
+	def quiescence_children(self) :
+		if self.terminal :
+			return []
+		board = self.board
+		moves = list(board.generate_legal_captures())
+		promoting = board.pawns & board.occupied_co[board.turn] & (chess.BB_RANK_7 if board.turn == chess.WHITE else chess.BB_RANK_2)
+		if promoting :
+			moves += [move for move in board.generate_legal_moves(promoting, ~board.occupied) if move.promotion == chess.QUEEN]
+		if self.node_ordering :
+			return self.orderer.order(board, moves, self.ply)
+		return moves
+
+	# material won by choice plus a margin for anything static_eval could add
+	def delta(self, choice) :
+		board = self.board
+		victim = board.piece_type_at(choice.to_square)
+		if victim is None and board.is_en_passant(choice) :
+			victim = chess.PAWN
+		gain = DELTA_MARGIN + (piece_values[victim] if victim is not None else 0)
+		if choice.promotion :
+			gain += piece_values[choice.promotion] - piece_values[chess.PAWN]
+		return gain
+
+	# root choices are only split when there's enough below them to be worth sending to another process
+	def split_search(self, choices, depth, alpha, beta, maxing) :
+		if self.root_split is None or depth < 1 :
+			return None
+		options = dict(pruning=self.pruning, t_table=self.t_table is not None, node_ordering=self.node_ordering,
+			quiescence=self.quiescence, quiescence_nodes=self.quiescence_nodes, pvs=self.pvs)
+		deadline = self.deadline if self.abortable else None # the workers stop when this search would
+		results = self.root_split.search(self.board, choices, depth, alpha, beta, options, deadline)
+		split = []
+		for result in results :
+			if result is None : # never started before the deadline
+				split.append(None)
+				continue
+			(quality, pv, pid, num_evaled, num_q_evaled) = result
+			self.num_evaled += num_evaled
+			self.num_q_evaled += num_q_evaled
+			self.split_nodes[pid] = self.split_nodes.get(pid, 0) + num_evaled
+			split.append((quality, pv) if quality is not None else None)
+		return split
+
+	def cutoff(self, choice, index, depth) :
+		self.cutoffs += 1
+		if index == 0 :
+			self.first_choice_cutoffs += 1
+		if self.node_ordering :
+			self.orderer.cutoff(self.board, choice, depth, self.ply)
+
+	def interrupted(self) :
+		return self.stop is not None and self.stop.is_set()
 
 	def eval(self) :
+		quality = self.terminal_eval()
+		self.terminal = quality is not None
+		if self.terminal :
+			return quality
 		if self.t_table != None :
-			fen = self.board.fen()
-			if (fen, 0) in self.t_table :
+			key = self.keys[-1]
+			entry = self.t_table.probe(key)
+			if entry is not None and entry[3] == EXACT :
 				self.t_table_hits += 1
-				return self.t_table[(fen, 0)]
+				return entry[1]
 			else :
 				self.t_table_miss += 1
-				score = get_eval(self.board)
-				self.t_table[(fen, 0)] = score
-				return score
+				quality = static_eval(self.board)
+				if entry is None : # don't clobber a searched bound with a static eval
+					self.t_table[(key, -1)] = quality # below depth 0 so lookup() doesn't skip quiescence search
+				return quality
+		else :
+			return static_eval(self.board)
+
+	# returns the score of the position if the game has ended or a draw can be claimed, otherwise None
+	# 	gives the same result as board.outcome(claim_draw=True), but repetitions are looked up in
+	# 	self.repetitions and the legal moves from children() are reused instead of replaying the move stack
+	def terminal_eval(self) :
+		board = self.board
+		key = self.keys[-1]
+		if self.legal_moves[0] == key :
+			moves = self.legal_moves[1]
+			has_moves = bool(moves)
 		else :
-			return get_eval(self.board)
+			moves = None
+			has_moves = any(board.generate_legal_moves())
 
-	def record(self, quality, depth, maxing) :
+		if not has_moves :
+			return score.checkmate(not board.turn) if board.is_check() else score.DRAW
+		if board.is_insufficient_material() :
+			return score.DRAW
+		if board.halfmove_clock >= 100 or self.repetitions[key] >= 3 :
+			return score.DRAW
+
+		# draws that can be claimed by making a move
+		if board.halfmove_clock == 99 or self.repeated :
+			if moves is None :
+				moves = list(board.generate_legal_moves())
+			if board.halfmove_clock == 99 and not all(board.is_zeroing(move) for move in moves) :
+				return score.DRAW
+			if self.repeated :
+				for move in moves :
+					child_key = zobrist.push(board, key, move)
+					board.pop()
+					if self.repetitions.get(child_key, 0) >= 2 :
+						return score.DRAW
+		return None
+
+	def count_position(self, key, n) :
+		count = self.repetitions.get(key, 0)
+		if (count >= 2) != (count + n >= 2) :
+			self.repeated += n
+		self.repetitions[key] = count + n
+
+	def record(self, quality, depth, maxing, bound=EXACT, choice=None) :
 		if self.t_table != None :
-			fen = self.board.fen()
-			self.t_table[(fen, depth)] = quality
+			self.t_table.store(self.keys[-1], quality, depth, bound, choice)
 			self.records += 1
 		else :
 			pass
 
 	def lookup(self, depth, maxing) :
 		if self.t_table != None :
-			fen = self.board.fen()
-			res = self.t_table[(fen, depth)]
-			if res is not None :
+			if self.repetitions[self.keys[-1]] >= 2 : # stored results don't know about repetitions in the path
+				return None
+			entry = self.t_table.probe(self.keys[-1])
+			if entry is None :
+				self.lookup_miss += 1
+				return None
+			if entry[2] >= depth :
 				self.lookup_hits += 1
-			else :
+				return (entry[1], entry[3], entry[4])
+			else : # too shallow to use the score, but the move is still a good first guess
 				self.lookup_miss += 1
-			return res
+				return (None, entry[3], entry[4])
 		else :
 			return None
 
 
 	def apply(self, choice) :
-		self.board.push(choice)
+		key = zobrist.push(self.board, self.keys[-1], choice)
+		self.keys.append(key)
+		self.count_position(key, 1)
 
 	def unapply(self) :
 		self.board.pop()
+		self.count_position(self.keys.pop(), -1)
 
 	@property
 	def min_eval(self) :
-		return Score.checkmate(chess.BLACK)
+		return -score.MATE
 
 	@property
 	def max_eval(self) :
-		return Score.checkmate(chess.WHITE)
+		return score.MATE
 
-	def is_solved_eval(self, score) :
-		return score.is_mate()
+	def is_solved_eval(self, quality) :
+		return score.is_mate(quality)
 
 	def inc_eval(self, e) :
-		return e.inc()
+		return score.inc(e)
 
 	def __str__(self) :
 		return str([str(m) for m in self.board.move_stack])
@@ -121,6 +232,14 @@ class ChessMinimax(Minimax) :
 		print("ChessMinimax search dump:")
 		print(f"fen = {self.board.fen()}")
 		print(f"num_evaled = {self.num_evaled}")
+		if self.quiescence :
+			print(f"num_q_evaled = {self.num_q_evaled}")
+		if self.split_nodes :
+			print(f"root split num_evaled = {', '.join(f'{pid}: {n}' for pid, n in self.split_nodes.items())}")
+		if self.pvs :
+			print(f"pvs re-searches = {self.pvs_researches}")
+		if self.aspiration is not None :
+			print(f"aspiration re-searches = {self.aspiration_researches}")
 
 		if self.t_table is not None and not self.node_ordering :
 			print(f"num_t_table_hits = {self.t_table_hits} ({round(self.t_table_hits/(self.t_table_hits+self.t_table_miss)*10000)/100 if self.t_table_hits+self.t_table_miss != 0 else 0}%)")
@@ -128,12 +247,10 @@ class ChessMinimax(Minimax) :
 		if self.t_table != None :
 			print(f"num_records = {self.records}")
 			print(f"num_lookup_hits = {self.lookup_hits}/{self.lookup_hits+self.lookup_miss} ({round(self.lookup_hits/(self.lookup_hits+self.lookup_miss)*10000)/100}%)")
-		if self.t_table != None and self.node_ordering :
-			print(f"num_internal_node_hits = {self.internal_node_hits}/{self.internal_node_hits+self.internal_node_miss} ({round(self.internal_node_hits/(self.internal_node_hits+self.internal_node_miss)*10000)/100}%)")
-		elif self.node_ordering :
-			print(f"Internal node evals = {self.internal_node_evals}")
+		print(f"first choice cutoffs = {self.first_choice_cutoffs}/{self.cutoffs} ({round(self.first_choice_cutoffs/self.cutoffs*10000)/100 if self.cutoffs != 0 else 0}%)")
 		print(f"depth = {self.search_depth}, maxing = {self.search_maxing}, best choice = {self.best_choice}")
-		print(f"depth 0 eval = {self.eval()}")
+		print(f"principal variation = {' '.join(str(m) for m in self.pv)}")
+		print(f"depth 0 eval = {Score(self.eval())}")
 		print(f"depth {self.search_depth} eval = {self.best_quality}")
 		if self.it_deepening :
 			print(f"it_deepening_termination_reason = {self.termination_reason}")
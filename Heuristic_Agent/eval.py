@@ -1,8 +1,7 @@
 import random
-from turtle import color
 import chess
 from math import inf, copysign
-from score import Score
+import score
 
 
 piece_values = {chess.PAWN: 1, chess.KNIGHT: 3, chess.BISHOP: 3, chess.ROOK: 5, chess.QUEEN: 9, chess.KING: 0}
@@ -11,8 +10,48 @@ pawn_dist_multiplier = 1.05
 passed_pawn_multiplier = 1.2
 boxed_out_passed_pawn_multiplier = 3
 
+# Precomputed pawn terms indexed by [<color>][<square>]
+# 	pawn_values        - value of a pawn on the square
+# 	passed_pawn_values - value of a passed pawn on the square
+# 	passed_pawn_masks  - squares that must be free of enemy pawns for a pawn on the square to be passed
+pawn_values = [[0] * 64, [0] * 64]
+passed_pawn_values = [[0] * 64, [0] * 64]
+passed_pawn_masks = [[0] * 64, [0] * 64]
+
+for sq in chess.SQUARES :
+	file, rank = chess.square_file(sq), chess.square_rank(sq)
+	for is_white, color in ((True, chess.WHITE), (False, chess.BLACK)) :
+		dist_traveled = (rank - 1) if is_white else (6 - rank)
+		pv = piece_values[chess.PAWN] * (pawn_dist_multiplier ** dist_traveled)
+		pawn_values[color][sq] = pv
+		passed_pawn_values[color][sq] = pv * passed_pawn_multiplier
+		ahead_ranks = range(rank+1,7) if is_white else range(1, rank)
+		mask = 0
+		for r in ahead_ranks :
+			for f in range(max(file-1, 0), min(file+1, 7)) :
+				mask |= chess.BB_SQUARES[chess.square(f, r)]
+		passed_pawn_masks[color][sq] = mask
+
 # returns (<points of white material>, <points of black material>)
+# 	only the occupied squares are visited and passed pawns are found with one mask per pawn
+# 	pieces are summed in square order so the result is identical to points_by_scan
 def points(board) :
+	pawns = board.pawns
+	res = []
+	for color in (chess.WHITE, chess.BLACK) :
+		total = 0
+		enemy_pawns = pawns & board.occupied_co[not color]
+		values, passed_values, masks = pawn_values[color], passed_pawn_values[color], passed_pawn_masks[color]
+		for sq in chess.scan_forward(board.occupied_co[color]) :
+			if pawns & chess.BB_SQUARES[sq] :
+				total += values[sq] if masks[sq] & enemy_pawns else passed_values[sq]
+			else :
+				total += piece_values[board.piece_type_at(sq)]
+		res.append(total)
+	return (res[0], res[1])
+
+# reference implementation of points - walks every square of the board
+def points_by_scan(board) :
 	w = b = 0
 	for sq in chess.SQUARES :
 		p = board.piece_at(sq)
@@ -47,17 +86,30 @@ def points(board) :
 
 ######################################################
 
+# returns the packed score (see score.py) of board
 def get_eval(board) :
 	outcome = board.outcome(claim_draw = True)
 	if outcome :
 		if outcome.winner == chess.WHITE :
-			return Score.checkmate(chess.WHITE)
+			return score.checkmate(chess.WHITE)
 		elif outcome.winner == chess.BLACK :
-			return Score.checkmate(chess.BLACK)
+			return score.checkmate(chess.BLACK)
 		else : 
-			return Score.draw()
+			return score.DRAW
+	return static_eval(board)
+
+# evaluation of a position without checking if the game has ended
+def static_eval(board) :
 	w_mat, b_mat = points(board)
-	score = Score.score(w_mat - b_mat)
-	return score
+	return w_mat - b_mat
+
+if __name__ == "__main__" :
+	# run tests - compare points against the reference implementation over random games
+	random.seed(1234)
+	for _ in range(200) :
+		board = chess.Board()
+		while not board.is_game_over() and len(board.move_stack) < 150 :
+			assert points(board) == points_by_scan(board), f"Failed points test: {board.fen()}"
+			board.push(random.choice(list(board.legal_moves)))
 
-	
\ No newline at end of file
+	print("passed all tests\n")
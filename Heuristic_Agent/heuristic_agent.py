@@ -8,20 +8,54 @@ from random import shuffle
 
 from agent import Agent
 from chess_minimax import ChessMinimax
+from util import move_time_budget
+from transposition_table import TranspositionTable
+from move_ordering import MoveOrderer
+from lazy_smp import LazySMP
+from root_split import RootSplit
 
 class Heuristic_Agent(Agent) :
 
-	def __init__(self, depth, timeout=None, pruning=True, t_table=True, node_ordering=True, it_deepening=True, verbose=False) :
+	def __init__(self, depth, timeout=None, pruning=True, t_table=True, node_ordering=True, it_deepening=True, quiescence=False, pvs=False, aspiration=None, clock=None, increment=0, workers=1, root_split=False, stats=None, verbose=False) :
 		self.depth = depth
 		self.timeout = timeout
 		self.pruning = pruning
-		self.t_table = t_table
+		# the transposition table and move orderer are kept for every move the agent makes - aged, not cleared
+		self.t_table = TranspositionTable() if t_table == True else t_table
 		self.node_ordering = node_ordering
+		self.orderer = MoveOrderer() if node_ordering else None
 		self.it_deepening = it_deepening
+		self.quiescence = quiescence
+		self.pvs = pvs
+		self.aspiration = aspiration
 		self.verbose = verbose
+		self.stats = stats # SearchStats that collects a record of every move's search - not supported by LazySMP
+
+		# seconds left on the agent's game clock - when set each move's timeout is budgeted from it instead of timeout
+		self.clock = clock
+		self.increment = increment
+
+		# with more than one worker moves are searched by a LazySMP, or by splitting the root choices across a
+		# RootSplit if root_split - the processes are started by the first move so the agent can still be pickled before it plays
+		self.workers = workers
+		self.use_root_split = root_split
+		self.smp = None
+		self.root_split = None
 		
 	def get_move(self, board, color) :
-		minimax = ChessMinimax(board, self.depth, timeout=self.timeout, color=color, pruning=self.pruning, t_table=self.t_table, node_ordering=self.node_ordering, it_deepening=self.it_deepening, verbose=self.verbose)
+		start_time = time.time()
+		timeout = move_time_budget(self.clock, self.increment) if self.clock is not None else self.timeout
+		if self.workers > 1 and not self.use_root_split :
+			if self.smp is None :
+				self.smp = LazySMP(self.workers, pruning=self.pruning, node_ordering=self.node_ordering, it_deepening=self.it_deepening, quiescence=self.quiescence, pvs=self.pvs, aspiration=self.aspiration, verbose=self.verbose)
+			move = self.smp.search(board, self.depth, timeout)
+			self.smp.dump()
+			if self.clock is not None :
+				self.clock += self.increment - (time.time() - start_time)
+			return move
+		if self.workers > 1 and self.root_split is None :
+			self.root_split = RootSplit(self.workers)
+		minimax = ChessMinimax(board, self.depth, timeout=timeout, color=color, pruning=self.pruning, t_table=self.t_table, node_ordering=self.node_ordering, orderer=self.orderer, it_deepening=self.it_deepening, quiescence=self.quiescence, pvs=self.pvs, aspiration=self.aspiration, root_split=self.root_split, instrument=self.stats, verbose=self.verbose)
 		# minimax_np = Minimax(board, self.depth, color=color, pruning=False)
 		# print("---")
 		# print("pruning")
@@ -30,6 +64,8 @@ class Heuristic_Agent(Agent) :
 		# minimax_np.dump()
 		# if(minimax.best_quality != minimax_np.best_quality) :
 		# 	print("MINIMAX mismatch")
+		if self.clock is not None :
+			self.clock += self.increment - (time.time() - start_time)
 		return minimax.best_choice
 
 
@@ -0,0 +1,163 @@
+import csv
+import json
+from time import perf_counter
+
+# Optional instrumentation of Minimax searches
+# 	A SearchStats is passed to a search as instrument=... and attach() wraps the methods it measures on that
+# 	instance only - searches without an instrument run the class's methods untouched, so it costs nothing when off.
+# 	Every search attached adds one record (a dict), so one SearchStats can collect a whole game, one record per move.
+
+class SearchStats :
+
+	def __init__(self) :
+		self.records = []
+		self.record = None # record of the search running now
+
+	# wraps the methods of minimax that are measured - called before minimax starts searching
+	def attach(self, minimax) :
+		record = {
+			"position": minimax.board.fen() if hasattr(minimax, "board") else str(minimax),
+			"iterations": [], # one entry per completed iterative deepening depth
+			"nodes_by_ply": {},
+			"cutoff_index": {}, # how many cutoffs happened on the n-th choice searched
+			"children_calls": 0,
+			"children_total": 0,
+			"eval_calls": 0,
+			"tt_lookups": 0,
+			"tt_hits": 0, # lookups whose score could be used
+			"tt_records": 0,
+			"time": {"children": 0.0, "eval": 0.0, "tt": 0.0},
+		}
+		self.record = record
+		times = record["time"]
+		nodes_by_ply = record["nodes_by_ply"]
+		cutoff_index = record["cutoff_index"]
+
+		search = minimax._search
+		def _search(depth, alpha, beta, maxing) :
+			nodes_by_ply[minimax.ply] = nodes_by_ply.get(minimax.ply, 0) + 1
+			return search(depth, alpha, beta, maxing)
+
+		children = minimax.children
+		def timed_children() :
+			start = perf_counter()
+			choices = children()
+			times["children"] += perf_counter() - start
+			record["children_calls"] += 1
+			record["children_total"] += len(choices)
+			return choices
+
+		evaluate = minimax.eval
+		def timed_eval() :
+			start = perf_counter()
+			quality = evaluate()
+			times["eval"] += perf_counter() - start
+			record["eval_calls"] += 1
+			return quality
+
+		lookup = minimax.lookup
+		def timed_lookup(depth, maxing) :
+			start = perf_counter()
+			res = lookup(depth, maxing)
+			times["tt"] += perf_counter() - start
+			record["tt_lookups"] += 1
+			if res is not None and res[0] is not None :
+				record["tt_hits"] += 1
+			return res
+
+		store = minimax.record
+		def timed_record(quality, depth, maxing, bound, choice=None) :
+			start = perf_counter()
+			store(quality, depth, maxing, bound, choice)
+			times["tt"] += perf_counter() - start
+			record["tt_records"] += 1
+
+		cutoff = minimax.cutoff
+		def counted_cutoff(choice, index, depth) :
+			cutoff_index[index] = cutoff_index.get(index, 0) + 1
+			cutoff(choice, index, depth)
+
+		minimax._search = _search
+		minimax.children = timed_children
+		minimax.eval = timed_eval
+		minimax.lookup = timed_lookup
+		minimax.record = timed_record
+		minimax.cutoff = counted_cutoff
+
+	# called by iterative deepening after every completed depth
+	def iteration(self, minimax, depth) :
+		iterations = self.record["iterations"]
+		nodes = sum(self.record["nodes_by_ply"].values())
+		prev_nodes = iterations[-1]["total_nodes"] if iterations else 0
+		iterations.append({
+			"depth": depth,
+			"time": minimax.search_time,
+			"total_nodes": nodes,
+			"nodes": nodes - prev_nodes,
+			# effective branching factor - growth in nodes searched from the last depth
+			"ebf": (nodes - prev_nodes) / iterations[-1]["nodes"] if iterations and iterations[-1]["nodes"] else None,
+		})
+
+	# called once minimax has finished searching
+	def finish(self, minimax) :
+		record = self.record
+		record["depth"] = minimax.completed_depth
+		record["best_choice"] = str(minimax.best_choice)
+		record["best_quality"] = minimax.best_quality
+		record["search_time"] = minimax.search_time
+		record["termination_reason"] = minimax.termination_reason
+		record["num_evaled"] = minimax.num_evaled
+		record["num_q_evaled"] = minimax.num_q_evaled
+		record["nodes"] = sum(record["nodes_by_ply"].values())
+		record["branching_factor"] = record["children_total"] / record["children_calls"] if record["children_calls"] else None
+		record["tt_hit_rate"] = record["tt_hits"] / record["tt_lookups"] if record["tt_lookups"] else None
+		record["nodes_per_second"] = record["nodes"] / minimax.search_time if minimax.search_time else None
+		self.records.append(record)
+		self.record = None
+
+	def to_json(self, path) :
+		with open(path, "w") as f :
+			json.dump(self.records, f, indent=1)
+
+	# one row per search - nested stats are written as json
+	def to_csv(self, path) :
+		if not self.records :
+			return
+		fields = list(self.records[0].keys())
+		with open(path, "w", newline="") as f :
+			writer = csv.DictWriter(f, fieldnames=fields)
+			writer.writeheader()
+			for record in self.records :
+				writer.writerow({k : json.dumps(v) if isinstance(v, (dict, list)) else v for k, v in record.items()})
+
+
+if __name__ == "__main__" :
+	# run tests - instrumented searches give the same results and collect consistent stats
+	import os, tempfile
+	import chess
+	import io, contextlib
+	from chess_minimax import ChessMinimax
+
+	fen = "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"
+	stats = SearchStats()
+	for depth in [1, 2, 3] :
+		with contextlib.redirect_stdout(io.StringIO()) :
+			plain = ChessMinimax(chess.Board(fen), depth)
+			instrumented = ChessMinimax(chess.Board(fen), depth, instrument=stats)
+		assert plain.best_quality == instrumented.best_quality and plain.num_evaled == instrumented.num_evaled
+		record = stats.records[-1]
+		assert [i["depth"] for i in record["iterations"]] == list(range(1, depth + 1))
+		assert record["iterations"][-1]["total_nodes"] == record["nodes"]
+		assert sum(record["cutoff_index"].values()) == instrumented.cutoffs
+		assert record["nodes_by_ply"][1] >= len(list(chess.Board(fen).legal_moves))
+		assert "children" not in vars(plain) # uninstrumented searches are left alone
+
+	directory = tempfile.mkdtemp()
+	stats.to_json(os.path.join(directory, "stats.json"))
+	stats.to_csv(os.path.join(directory, "stats.csv"))
+	with open(os.path.join(directory, "stats.json")) as f :
+		assert len(json.load(f)) == 3
+	with open(os.path.join(directory, "stats.csv")) as f :
+		assert len(list(csv.DictReader(f))) == 3
+
+	print("passed all tests\n")
@@ -0,0 +1,123 @@
+import multiprocessing
+import weakref
+import chess
+
+from chess_minimax import ChessMinimax
+from shared_table import SharedTranspositionTable
+from transposition_table import DEFAULT_TABLE_SIZE
+from move_ordering import MoveOrderer
+
+# Lazy SMP - several worker processes search the same root and only cooperate through a shared transposition table
+# 	worker 0 searches like a single process search would, the other workers search one ply deeper every other
+# 	worker and start from rotated root orders, so they fill the table with different parts of the tree ahead of it
+# 	the other workers are stopped as soon as worker 0 finishes and the deepest completed search is used
+# The worker processes are kept alive between searches, each with its own killer / history tables
+
+_worker = {} # search state kept in a worker process
+
+def _init_worker(table_name, table_size, stop) :
+	_worker["t_table"] = SharedTranspositionTable(table_size, name=table_name)
+	_worker["orderer"] = MoveOrderer()
+	_worker["stop"] = stop
+
+# searches the position reached by playing moves (uci strings) from fen in a worker process
+def _search(fen, moves, depth, timeout, index, options) :
+	board = chess.Board(fen)
+	for move in moves :
+		board.push_uci(move)
+	root_order = None
+	if index != 0 :
+		root_order = list(board.legal_moves)
+		if root_order :
+			shift = index % len(root_order)
+			root_order = root_order[shift:] + root_order[:shift]
+	minimax = ChessMinimax(board, depth + index % 2, timeout=timeout, color=board.turn, t_table=_worker["t_table"], orderer=_worker["orderer"],
+		root_order=root_order, stop=_worker["stop"] if index != 0 else None, **options)
+	return {
+		"completed_depth": minimax.completed_depth,
+		"best_quality": minimax.best_quality, # Score - printed as mate / centipawn text
+		"best_choice": minimax.best_choice.uci() if minimax.best_choice is not None else None,
+		"pv": [move.uci() for move in minimax.pv],
+		"num_evaled": minimax.num_evaled,
+		"num_q_evaled": minimax.num_q_evaled,
+		"termination_reason": minimax.termination_reason,
+	}
+
+def _close(pool, t_table) :
+	pool.terminate()
+	pool.join()
+	t_table.close()
+
+class LazySMP :
+
+	# options are passed through to every worker's ChessMinimax (ie. pruning, quiescence, pvs)
+	def __init__(self, workers=multiprocessing.cpu_count(), table_size=DEFAULT_TABLE_SIZE, **options) :
+		assert workers >= 1, "LazySMP needs at least one worker"
+		self.workers = workers
+		self.options = options
+		self.t_table = SharedTranspositionTable(table_size)
+		self.stop = multiprocessing.Event()
+		self.pool = multiprocessing.Pool(workers, initializer=_init_worker, initargs=(self.t_table.name, table_size, self.stop))
+		self._finalizer = weakref.finalize(self, _close, self.pool, self.t_table)
+
+		self.results = [] # result of every worker from the last search
+		self.result = None # result that was used from the last search
+
+	# searches board and returns the best move of the deepest completed search
+	def search(self, board, depth, timeout=None) :
+		self.t_table.new_search()
+		self.stop.clear()
+		root = board.root()
+		fen = root.fen()
+		moves = [move.uci() for move in board.move_stack]
+		pending = [self.pool.apply_async(_search, (fen, moves, depth, timeout, i, self.options)) for i in range(self.workers)]
+		main = pending[0].get()
+		self.stop.set()
+		self.results = [main] + [p.get() for p in pending[1:]]
+
+		# deepest search wins, ties go to the lowest worker
+		self.result = max(self.results, key = lambda r : r["completed_depth"] if r["best_choice"] is not None else -1)
+		return chess.Move.from_uci(self.result["best_choice"])
+
+	def dump(self) :
+		print("LazySMP search dump:")
+		for i, r in enumerate(self.results) :
+			print(f"worker {i}: depth = {r['completed_depth']}, best choice = {r['best_choice']}, eval = {r['best_quality']}, num_evaled = {r['num_evaled']}, {r['termination_reason']}")
+		print(f"num_evaled = {sum(r['num_evaled'] for r in self.results)}")
+		print(f"principal variation = {' '.join(self.result['pv'])}")
+		print()
+
+	def close(self) :
+		self._finalizer()
+
+
+if __name__ == "__main__" :
+	# compare the time taken for the same fixed depth search with one and several workers
+	import io, contextlib
+	from time import time
+
+	fens = [
+		chess.STARTING_FEN,
+		"r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+		"r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3",
+	]
+
+	# helpers searching without iterative deepening are still stopped as soon as worker 0 finishes
+	smp = LazySMP(2, it_deepening=False)
+	board = chess.Board(fens[1])
+	with contextlib.redirect_stdout(io.StringIO()) :
+		smp.search(board, 3)
+	assert smp.result is smp.results[0] and smp.results[1]["completed_depth"] == 0, f"helper wasn't stopped: {smp.results[1]}"
+	smp.close()
+
+	depth = 4
+	for workers in [1, min(4, multiprocessing.cpu_count())] :
+		smp = LazySMP(workers)
+		start_time = time()
+		for fen in fens :
+			board = chess.Board(fen)
+			with contextlib.redirect_stdout(io.StringIO()) :
+				move = smp.search(board, depth)
+			print(f"workers = {workers}: {move} eval = {smp.result['best_quality']} depth = {smp.result['completed_depth']}")
+		print(f"workers = {workers}: {round(time() - start_time, 2)}s")
+		smp.close()
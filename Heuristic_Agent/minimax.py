@@ -1,8 +1,9 @@
-from math import inf, exp
+from math import inf, exp, nextafter
 from time import time
 from util import exponential_regression_eval
 
 from eval import get_eval
+from transposition_table import EXACT, LOWER, UPPER
 
 # Each minimax search is done as a class so that stats can be collected
 # Minimax is not intended to be used on it's own - it must be subclassed
@@ -16,14 +17,22 @@ from eval import get_eval
 #       - self.max_eval() (@property) # the maximum evaluation possible
 #       - inc_eval() # returns resultant eval from passing eval back one branch in minimax tree
 #   Optional
-#       - record(quality, depth, maxing) # not required - may be used to record a result into a transposition table
-#       - lookup(depth, maxing) # not required - may be used to check in transposition table - returns quality or None
+#       - record(quality, depth, maxing, bound, choice) # not required - may be used to record a result into a transposition table
+#       - lookup(depth, maxing) # not required - may be used to check in transposition table - returns None or (quality, bound, choice)
+#             quality is None if the stored result was not searched to depth, choice may still be used for move ordering
+#       - cutoff(choice, index, depth) # not required - called when choice (the index-th choice searched) causes a pruning cutoff
+#       - quiescence_children() # required if quiescence is enabled - choices to keep searching past the horizon (ie. captures)
+#       - delta(choice) # not required - largest gain choice could make in quiescence search, None disables delta pruning for the choice
+#       - split_search(choices, depth, alpha, beta, maxing) # not required - may search root choices somewhere else (ie. other processes)
+#             returns a list of (quality, pv) for each choice as _search would give them, or None to search them here
+#             the search's deadline applies to them - a choice that wasn't completely searched by then is None and aborts the search
+#       - interrupted() # not required - polled with the deadline, returning True aborts the search even if there's no earlier result to fall back on
 #       - is_solved_eval(quality) # not required - may be used to terminate it_deepening early if quality represents a solved search that doesn't require more investigation
 #   Debug methods - optional
 #       - dump()
 class Minimax :
 
-	def __init__(self, depth, timeout=None, alpha=None, beta=None, maxing=True, pruning=True, it_deepening = True, verbose = False):
+	def __init__(self, depth, timeout=None, alpha=None, beta=None, maxing=True, pruning=True, it_deepening = True, quiescence = False, quiescence_nodes = 1000, pvs = False, aspiration = None, poll_nodes = 256, root_order = None, deadline = None, instrument = None, verbose = False):
 		if alpha == None :
 			self.search_alpha = self.min_eval
 		else :
@@ -35,28 +44,63 @@ class Minimax :
 			self.search_beta = beta
 
 		assert timeout is None or it_deepening, "Timeout cannot be specified without iterative deepening" 
+		assert deadline is None or not it_deepening, "Deadline cannot be specified with iterative deepening - use timeout"
 		self.timeout = timeout # number of seconds to search for
+		self.deadline = deadline # time at which a running search is aborted - given for a search that's part of a bigger one, which throws its result away if aborted
+		self.abortable = False # whether the running search may be aborted - there's an earlier result to fall back on
+		self.aborted = False
+		self.abort_reason = None
+		self.poll_nodes = poll_nodes # nodes searched between checks of the deadline
+		self.poll_countdown = poll_nodes
 		self.search_depth = depth
 		self.search_maxing = maxing
 		self.pruning = pruning
 		self.it_deepening = it_deepening
+		self.quiescence = quiescence
+		self.quiescence_nodes = quiescence_nodes # max nodes searched past each horizon node
+		self.quiescence_left = 0
+		self.pvs = pvs # principal variation search - choices after the first are searched with a null window
+		self.aspiration = aspiration # half width of the window around the last iteration's quality, None searches the full window
 		self.verbose = verbose
+		self.instrument = instrument # collects search stats (ie. instrumentation.SearchStats) - None when not profiling
 		
+		# move ordering carried between iterative deepening iterations
+		self.pv = [] # principal variation of the last completed search
+		self.prev_pv = [] # principal variation searched first at every ply
+		self.last_pv = [] # principal variation below the node most recently returned from _search
+		self.on_pv = False # true while the current path matches prev_pv
+		self.root_order = root_order # root choices sorted by the last iteration's qualities
+		self.ply = 0
+
 		# perf stats
+		self.completed_depth = 0 # deepest search that wasn't aborted
 		self.num_evaled = 0
+		self.num_q_evaled = 0 # nodes searched past the horizon by quiescence search
+		self.pvs_researches = 0 # null window searches that had to be repeated with the full window
+		self.aspiration_researches = 0 # iterations that had to be repeated with a wider window
 		self.search_time = 0 # in seconds
 		self.termination_reason = None
 
 		# perform the search
+		if self.instrument is not None :
+			self.instrument.attach(self)
 		if self.it_deepening :
 			(self.best_quality, self.best_choice) = self.it_deepening_search(depth, self.search_alpha, self.search_beta, maxing)
 		else :
+			self.abortable = self.deadline is not None
 			(self.best_quality, self.best_choice) = self.search(depth, self.search_alpha, self.search_beta, maxing)
+			if not self.aborted :
+				self.completed_depth = depth
+		if self.instrument is not None :
+			self.instrument.finish(self)
 
 	def it_deepening_search(self, depth, alpha, beta, maxing) :
 		# will go to at least depth depth, but keep going until self.timout time has passed
+		# 	the timeout is a hard limit once depth 1 is complete - the iteration running at the deadline is aborted
+		# 	and its result is used only if at least one root choice was completely searched
 
 		res = None
+		deadline = time() + self.timeout if self.timeout is not None else None
 		cutoff_at_depth = depth != 0
 		assert cutoff_at_depth or self.timeout is not None, "it_deepening cannot be executed without stopping condition"
 		times = []
@@ -75,14 +119,29 @@ class Minimax :
 						self.termination_reason = f"Predicting to exceed search time ({round(prediction*100)/100}s > {self.timeout}s)"
 						break
 			
-			# search depth d+1
-			res = self.search(d+1, alpha, beta, maxing)
+			# search depth d+1 - ordered by the previous iteration's results
+			self.prev_pv = self.pv
+			self.deadline = deadline
+			self.abortable = res is not None
+			if self.aspiration is not None and res is not None :
+				it_res = self.aspiration_search(d+1, res[0], alpha, beta, maxing)
+			else :
+				it_res = self.search(d+1, alpha, beta, maxing)
+			if self.aborted :
+				if it_res[1] is not None or res is None : # take the best of the root choices that were completely searched
+					res = it_res
+				self.termination_reason = f"{self.abort_reason} (aborted depth {d+1})"
+				break
+			res = it_res
 			d += 1
+			self.completed_depth = d
 
 			# record time and update search depth
 			self.search_depth = max(self.search_depth, d)
 			times.append(self.search_time)
-			print(f"time after depth {d} = {self.search_time}")
+			if self.verbose : print(f"time after depth {d} = {self.search_time}")
+			if self.instrument is not None :
+				self.instrument.iteration(self, d)
 
 			# check if search has stalled
 			if self.is_solved_eval(res[0]) :
@@ -91,6 +150,25 @@ class Minimax :
 			
 		assert res is not None
 		return res
+
+	# searches with a window of self.aspiration either side of guess
+	# 	the side of the window that the result falls outside of is opened up to (alpha, beta) and the search repeated
+	def aspiration_search(self, depth, guess, alpha, beta, maxing) :
+		asp_alpha = max(alpha, guess - self.aspiration)
+		asp_beta = min(beta, guess + self.aspiration)
+		while True :
+			res = self.search(depth, asp_alpha, asp_beta, maxing)
+			if self.aborted :
+				return res
+			if res[0] <= asp_alpha and asp_alpha > alpha :
+				asp_alpha = alpha
+			elif res[0] >= asp_beta and asp_beta < beta :
+				asp_beta = beta
+			else :
+				return res
+			if self.verbose : print(f"-- Aspiration window failed with {res[0]}, searching again with (a,b) = {(asp_alpha, asp_beta)}")
+			self.aspiration_researches += 1
+			self.prev_pv = self.pv
 		
 
 	# returns (<best achivable quality>, <best choice>)
@@ -102,16 +180,50 @@ class Minimax :
 			if self.verbose : print(f"---- Leaf Node {self} ===> {quality}")
 			self.search_time += time() - start_time
 			return (quality, None)
-		choices = self.children()
+		if self.root_order is not None :
+			choices = list(self.root_order)
+		else :
+			choices = self.children()
+			lookup_res = self.lookup(depth, maxing)
+			if lookup_res is not None and lookup_res[2] in choices : # search the stored best choice first
+				choices.remove(lookup_res[2])
+				choices.insert(0, lookup_res[2])
+		if self.prev_pv and self.prev_pv[0] in choices :
+			choices.remove(self.prev_pv[0])
+			choices.insert(0, self.prev_pv[0])
+		search_alpha, search_beta = alpha, beta
 		best_quality = self.min_eval if maxing else self.max_eval
 		best_choice = None
-		for choice in choices:
-			self.apply(choice)
-			quality = self.inc_eval(self._search(depth - 1, alpha, beta, not maxing))
-			self.unapply()
+		best_pv = []
+		root_qualities = []
+		split = None
+		for i, choice in enumerate(choices):
+			if i == 1 : # once the first choice has set the bound the rest may be searched at once
+				split = self.split_search(choices[1:], depth - 1, alpha, beta, maxing)
+				if split is not None and None in split : # the deadline passed before every choice was searched
+					if self.verbose : print("-- Aborting search: Search time exceeded")
+					self.aborted = True
+					self.abort_reason = "Search time exceeded"
+			if split is not None :
+				if split[i - 1] is None : # choice wasn't completely searched
+					continue
+				(quality, pv) = split[i - 1]
+				quality = self.inc_eval(quality)
+			else :
+				self.on_pv = i == 0 and bool(self.prev_pv) and choice == self.prev_pv[0]
+				self.apply(choice)
+				self.ply = 1
+				quality = self.inc_eval(self._search_child(depth - 1, alpha, beta, maxing, i == 0))
+				self.ply = 0
+				self.unapply()
+				if self.aborted : # choice wasn't completely searched
+					break
+				pv = self.last_pv
+			root_qualities.append(quality)
 			if (maxing and quality > best_quality) or (not maxing and quality < best_quality) :
 				best_quality = quality
 				best_choice = choice
+				best_pv = [choice] + pv
 			if self.pruning :
 				if maxing and best_quality > alpha :
 					if self.verbose : print(f"alpha = {best_quality} after choice {choice}")
@@ -120,6 +232,17 @@ class Minimax :
 					if self.verbose : print(f"beta = {best_quality} after choice {choice}")
 					beta = best_quality
 		if self.verbose : print(f"---- Ending base-level search: {self} ===> {(best_quality, best_choice)}")
+		if self.aborted :
+			self.pv = best_pv
+			self.on_pv = False
+			self.search_time += time() - start_time
+			return (best_quality, best_choice)
+		# sort is stable so choices with equal qualities keep their order
+		order = sorted(range(len(choices)), key = lambda i : root_qualities[i], reverse = maxing)
+		self.root_order = [choices[i] for i in order]
+		self.pv = best_pv
+		self.on_pv = False
+		self.record(best_quality, depth, maxing, self.bound(best_quality, search_alpha, search_beta), best_choice)
 		self.search_time += time() - start_time
 		return (best_quality, best_choice)
 
@@ -127,35 +250,80 @@ class Minimax :
 	
 	# returns best achievable quality - returning best choices is incompatible with alpha beta pruning
 	def _search(self, depth, alpha, beta, maxing) :
+		self.poll_countdown -= 1
+		if self.poll_countdown <= 0 :
+			self.poll()
+		if self.aborted : # worst possible quality for the player choosing this node, nothing is recorded
+			self.last_pv = []
+			return self.max_eval if maxing else self.min_eval
 		lookup_res = self.lookup(depth, maxing)
+		tt_choice = None
 		if lookup_res is not None :
-			if depth == 0 :
-				self.num_evaled += 1
-			return lookup_res
-		choices = self.children()
+			(quality, bound, tt_choice) = lookup_res
+			if quality is not None :
+				if bound == EXACT or (bound == LOWER and quality >= beta) or (bound == UPPER and quality <= alpha) :
+					if depth == 0 :
+						self.num_evaled += 1
+					self.last_pv = []
+					return quality
+				# the stored bound can still narrow the window
+				if bound == LOWER and quality > alpha :
+					alpha = quality
+				elif bound == UPPER and quality < beta :
+					beta = quality
+		choices = self.children() if depth != 0 else None
 		if depth == 0 or not choices :
 			self.num_evaled += 1
-			quality = self.eval()
+			if depth == 0 and self.quiescence :
+				self.quiescence_left = self.quiescence_nodes
+				quality = self._quiesce(alpha, beta, maxing)
+			else :
+				quality = self.eval()
 			if self.verbose : print(f"---- Leaf Node {self} ===> {quality}")
+			self.last_pv = []
 			return quality
+		if tt_choice is not None and tt_choice in choices : # search the stored best choice first
+			choices.remove(tt_choice)
+			choices.insert(0, tt_choice)
+		if self.on_pv : # search the previous iteration's principal variation first
+			if self.ply < len(self.prev_pv) and self.prev_pv[self.ply] in choices :
+				pv_choice = self.prev_pv[self.ply]
+				choices.remove(pv_choice)
+				choices.insert(0, pv_choice)
+			else :
+				self.on_pv = False
 		
 		if self.verbose : print(f"-- Starting search: maxing = {maxing}, (a,b) = {(alpha, beta)} -- {self}")
+		search_alpha, search_beta = alpha, beta
+		best_choice = None
+		best_pv = []
 
 		if maxing : # Maximizing
 
 			best_quality = self.min_eval
 			
-			for choice in choices:
+			for i, choice in enumerate(choices):
 
 				self.apply(choice)
-				best_quality = max(best_quality, self._search(depth - 1, alpha, beta, not maxing))
+				self.ply += 1
+				quality = self._search_child(depth - 1, alpha, beta, maxing, i == 0)
+				self.ply -= 1
 				self.unapply()
+				self.on_pv = False # only the first choice can continue the principal variation
+				if self.aborted :
+					break
+
+				if best_choice is None or quality > best_quality :
+					best_quality = quality
+					best_choice = choice
+					best_pv = [choice] + self.last_pv
 
 				if self.pruning :
 					if best_quality >= beta :
 						if self.verbose : 
 							print(f"*Pruning after {choice}")
 							print(f"\tmaxing = {maxing}, (a,b) = {(alpha, beta)}, best_quality = {best_quality}")
+						self.cutoff(choice, i, depth)
 						break
 					if best_quality > alpha :
 						if self.verbose : print(f"alpha = {best_quality} after choice {choice}")
@@ -164,26 +332,138 @@ class Minimax :
 		else : # Minimizing player
 			best_quality = self.max_eval
 			
-			for choice in choices:
+			for i, choice in enumerate(choices):
 
 				self.apply(choice)
-				best_quality = min(best_quality, self._search(depth - 1, alpha, beta, not maxing))
+				self.ply += 1
+				quality = self._search_child(depth - 1, alpha, beta, maxing, i == 0)
+				self.ply -= 1
 				self.unapply()
+				self.on_pv = False # only the first choice can continue the principal variation
+				if self.aborted :
+					break
+
+				if best_choice is None or quality < best_quality :
+					best_quality = quality
+					best_choice = choice
+					best_pv = [choice] + self.last_pv
 
 				if self.pruning :
 					if best_quality <= alpha :
 						if self.verbose : 
 							print(f"*Pruning after {choice}")
 							print(f"\tmaxing = {maxing}, (a,b) = {(alpha, beta)}, best_quality = {best_quality}")
+						self.cutoff(choice, i, depth)
 						break
 					if best_quality < beta :
 						if self.verbose : print(f"beta = {best_quality} after choice {choice}")
 						beta = best_quality
 
 		if self.verbose : print(f"---- Ending search {self} ===> {best_quality}")
-		self.record(best_quality, depth, maxing)
+		if self.aborted :
+			self.last_pv = []
+			return self.max_eval if maxing else self.min_eval
+		quality = self.inc_eval(best_quality)
+		self.last_pv = best_pv
+		self.record(quality, depth, maxing, self.bound(best_quality, search_alpha, search_beta), best_choice)
+		return quality
+
+	# searches the child that was just applied, maxing is the player choosing it
+	# 	with pvs, choices after the first are only tested against the best quality found so far using a
+	# 	null window (no quality lies strictly inside it) - they're searched again with the full window if they might be better
+	def _search_child(self, depth, alpha, beta, maxing, first) :
+		if self.pvs and self.pruning and not first and alpha < beta :
+			if maxing :
+				quality = self._search(depth, alpha, nextafter(alpha, inf), not maxing)
+			else :
+				quality = self._search(depth, nextafter(beta, -inf), beta, not maxing)
+			if not alpha < quality < beta :
+				return quality
+			self.pvs_researches += 1
+			if self.verbose : print(f"-- Null window search returned {quality}, searching again with (a,b) = {(alpha, beta)}")
+		return self._search(depth, alpha, beta, not maxing)
+
+	# searches the choices given by quiescence_children() past the horizon until the position is quiet
+	# 	the player may always stand pat (take the eval of the position) instead of making a choice
+	# 	stops searching new choices once quiescence_nodes nodes have been searched from the horizon node
+	def _quiesce(self, alpha, beta, maxing) :
+		self.poll_countdown -= 1
+		if self.poll_countdown <= 0 :
+			self.poll()
+		stand_pat = self.eval()
+		if self.quiescence_left <= 0 or self.aborted :
+			return stand_pat
+		if self.pruning :
+			if maxing :
+				if stand_pat >= beta :
+					return stand_pat
+				alpha = max(alpha, stand_pat)
+			else :
+				if stand_pat <= alpha :
+					return stand_pat
+				beta = min(beta, stand_pat)
+
+		best_quality = stand_pat
+		searched = False # whether any choice was searched - standing pat is a plain leaf, so it's passed back as it is
+		for choice in self.quiescence_children() :
+			if self.quiescence_left <= 0 :
+				break
+			gain = self.delta(choice)
+			if gain is not None and self.pruning : # delta pruning - choice can't raise the score past the window
+				if (maxing and stand_pat + gain <= alpha) or (not maxing and stand_pat - gain >= beta) :
+					continue
+
+			self.quiescence_left -= 1
+			self.num_q_evaled += 1
+			searched = True
+			self.apply(choice)
+			self.ply += 1
+			quality = self._quiesce(alpha, beta, not maxing)
+			self.ply -= 1
+			self.unapply()
+			if self.aborted :
+				break
+
+			if maxing :
+				best_quality = max(best_quality, quality)
+				if self.pruning :
+					if best_quality >= beta :
+						break
+					alpha = max(alpha, best_quality)
+			else :
+				best_quality = min(best_quality, quality)
+				if self.pruning :
+					if best_quality <= alpha :
+						break
+					beta = min(beta, best_quality)
+
+		if not searched :
+			return stand_pat
 		return self.inc_eval(best_quality)
 
+	# called every poll_nodes nodes - aborts the search once the deadline has passed or it's interrupted
+	# 	the deadline only aborts a search with an earlier result to fall back on, an interrupted search's result isn't wanted
+	def poll(self) :
+		self.poll_countdown = self.poll_nodes
+		if self.abortable and self.deadline is not None and time() >= self.deadline :
+			self.abort_reason = "Search time exceeded"
+		elif self.interrupted() :
+			self.abort_reason = "Search interrupted"
+		else :
+			return
+		if self.verbose : print(f"-- Aborting search: {self.abort_reason}")
+		self.aborted = True
+
+	# classifies a result searched with window (alpha, beta) as an exact score or a bound on the true score
+	def bound(self, quality, alpha, beta) :
+		if not self.pruning :
+			return EXACT
+		if quality <= alpha :
+			return UPPER
+		if quality >= beta :
+			return LOWER
+		return EXACT
+
 	##########################################
 	####### Abstract method declarations
 	##########################################
@@ -212,13 +492,32 @@ class Minimax :
 		raise NotImplementedError()
 
 	# May be implemented by subclass - by default does nothing
-	def record(self, quality, depth, maxing) :
+	def record(self, quality, depth, maxing, bound=EXACT, choice=None) :
 		pass
 
 	# May be implemented by subclass - by default does nothing
 	def lookup(self, depth, maxing) :
 		return None
 
+	# May be implemented by subclass - by default does nothing
+	def cutoff(self, choice, index, depth) :
+		pass
+
+	def quiescence_children(self) :
+		raise NotImplementedError()
+
+	# May be implemented by subclass - by default choices are never delta pruned
+	def delta(self, choice) :
+		return None
+
+	# May be implemented by subclass - by default every choice is searched here
+	def split_search(self, choices, depth, alpha, beta, maxing) :
+		return None
+
+	# May be implemented by subclass - by default searches are only aborted by the deadline
+	def interrupted(self) :
+		return False
+
 	def is_solved_eval(self, quality) :
 		return False
 
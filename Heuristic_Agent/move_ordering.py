@@ -0,0 +1,69 @@
+import chess
+
+MAX_PLY = 128 # deepest ply that killer moves are kept for
+
+# Orders moves without evaluating any child positions
+# 	- captures and promotions first, most valuable victim / least valuable attacker
+# 	- then the killer moves of the ply (quiet moves that caused a cutoff at the same ply)
+# 	- then the remaining quiet moves by history score (cutoffs caused anywhere in the tree)
+class MoveOrderer :
+
+	def __init__(self) :
+		self.killers = [[None, None] for _ in range(MAX_PLY)]
+		self.history = [0] * (2 * 64 * 64) # indexed by (<color>, <from square>, <to square>)
+		self.root_ply = None # game ply of the position the last search started from
+
+	# called at the start of every search from board - the orderer can be kept between the moves of a game
+	# 	killers are shifted so they stay at the same distance from the start of the game, history is halved
+	# 	so old cutoffs count for less than the new search's - nothing changes for another search of the same ply
+	def new_search(self, board) :
+		ply = board.ply()
+		if self.root_ply is not None and ply != self.root_ply :
+			shift = ply - self.root_ply
+			if 0 <= shift < MAX_PLY :
+				self.killers = self.killers[shift:] + [[None, None] for _ in range(shift)]
+			else : # not the same game - killers no longer apply
+				self.killers = [[None, None] for _ in range(MAX_PLY)]
+			history = self.history
+			for i in range(len(history)) :
+				history[i] >>= 1
+		self.root_ply = ply
+
+	# returns moves (a list of legal moves in board) ordered best guess first
+	def order(self, board, moves, ply) :
+		captures = []
+		killers = []
+		quiets = []
+		enemies = board.occupied_co[not board.turn]
+		killer_moves = self.killers[ply] if ply < MAX_PLY else (None, None)
+		history = self.history
+		color_index = 4096 if board.turn else 0
+		for move in moves :
+			if enemies & chess.BB_SQUARES[move.to_square] :
+				victim = board.piece_type_at(move.to_square)
+			elif move.to_square == board.ep_square and board.pawns & chess.BB_SQUARES[move.from_square] :
+				victim = chess.PAWN
+			else :
+				victim = None
+			if victim is not None or move.promotion :
+				score = (victim or 0) * 8 + (move.promotion or 0) * 8 - board.piece_type_at(move.from_square)
+				captures.append((score, move))
+			elif move == killer_moves[0] or move == killer_moves[1] :
+				killers.append(move)
+			else :
+				quiets.append((history[color_index + move.from_square * 64 + move.to_square], move))
+		captures.sort(key = lambda x : x[0], reverse=True)
+		quiets.sort(key = lambda x : x[0], reverse=True)
+		return [move for _, move in captures] + killers + [move for _, move in quiets]
+
+	# records that move caused a cutoff depth plies from the horizon, ply plies from the root
+	# 	only quiet moves are recorded - captures are already ordered first
+	def cutoff(self, board, move, depth, ply) :
+		if board.piece_type_at(move.to_square) is not None or move.promotion or board.is_en_passant(move) :
+			return
+		if ply < MAX_PLY :
+			killers = self.killers[ply]
+			if killers[0] != move :
+				killers[1] = killers[0]
+				killers[0] = move
+		self.history[(4096 if board.turn else 0) + move.from_square * 64 + move.to_square] += depth * depth
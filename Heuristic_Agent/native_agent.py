@@ -0,0 +1,91 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cpp-chess"))
+import time
+import chess
+
+from agent import Agent
+from util import move_time_budget
+import cpp_chess
+
+# Agent that searches with the C++ engine in cpp-chess (build it with make in cpp-chess first)
+# 	iteratively deepens up to depth (as deep as it can when 0) within timeout seconds (or a budget from clock) and nodes
+# The native board is kept between moves, so the engine's transposition table is too - it's created by the
+# first move so the agent can still be pickled before it plays.
+
+class Native_Agent(Agent) :
+
+	def __init__(self, depth=0, timeout=None, nodes=None, clock=None, increment=0, verbose=False) :
+		super().__init__(None)
+		assert depth > 0 or timeout or nodes or clock is not None, "Native_Agent needs a depth, timeout, nodes or clock"
+		self.depth = depth
+		self.timeout = timeout
+		self.nodes = nodes
+		self.clock = clock
+		self.increment = increment
+		self.verbose = verbose
+		self.board = None # cpp_chess.Board
+		self.fen = None # root fen of the native board
+		self.moves = [] # moves pushed onto the native board
+		self.result = None # result of the last search
+
+	# brings the native board to the same position as board - only the new moves are played if it's the same game
+	# 	the new moves are sent packed in one call into the library
+	def sync(self, board) :
+		fen = board.root().fen()
+		moves = board.move_stack
+		if self.board is None or self.fen != fen or self.moves != moves[:len(self.moves)] :
+			self.board = cpp_chess.Board(fen)
+			self.fen = fen
+			self.moves = []
+		new_moves = moves[len(self.moves):]
+		if new_moves :
+			self.board.make_moves(new_moves)
+		self.moves = list(moves)
+
+	def get_move(self, board, color) :
+		assert board.turn == color, "Native_Agent asked to make a move when it's not its turn"
+		start_time = time.time()
+		timeout = move_time_budget(self.clock, self.increment) if self.clock is not None else self.timeout
+		self.sync(board)
+		self.result = self.board.search(self.depth, timeout, self.nodes)
+		if self.verbose :
+			self.dump()
+		if self.clock is not None :
+			self.clock += self.increment - (time.time() - start_time)
+		return self.result["best_move"]
+
+	def dump(self) :
+		r = self.result
+		print("Native search dump:")
+		print(f"best move = {r['best_move']}, score = {r['score']}, mate in = {r['mate_in']}, depth = {r['depth']}")
+		print(f"principal variation = {' '.join(move.uci() for move in r['pv'])}")
+		print(f"time = {round(r['time'], 3)}s, {', '.join(f'{k} = {v}' for k, v in r['stats'].items())}")
+		print()
+
+
+if __name__ == "__main__" :
+	# run tests - finds a mate and plays a game against itself staying in sync with the python board
+	agent = Native_Agent(3)
+	board = chess.Board("6k1/5ppp/8/8/8/8/5PPP/R5K1 w - - 0 1")
+	assert agent.get_move(board, chess.WHITE) == chess.Move.from_uci("a1a8")
+	assert agent.result["mate_in"] == 1
+
+	board = chess.Board()
+	while not board.is_game_over() and len(board.move_stack) < 20 :
+		move = agent.get_move(board, board.turn)
+		assert move in board.legal_moves
+		board.push(move)
+		agent.sync(board)
+		assert agent.board.get_fen().split()[:4] == board.fen().split()[:4]
+
+	# budgets stop the search but still give a move
+	board = chess.Board()
+	assert Native_Agent(nodes=500).get_move(board, chess.WHITE) in board.legal_moves
+	assert Native_Agent(timeout=0.05).get_move(board, chess.WHITE) in board.legal_moves
+
+	# a new game rebuilds the native board
+	board = chess.Board("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1")
+	assert agent.get_move(board, chess.WHITE) in board.legal_moves
+
+	print("passed all tests\n")
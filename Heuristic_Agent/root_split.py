@@ -0,0 +1,144 @@
+import os
+from time import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from multiprocessing import cpu_count
+import chess
+
+from chess_minimax import ChessMinimax
+from transposition_table import TranspositionTable
+from move_ordering import MoveOrderer
+
+# Root splitting - once the first root choice has been searched, the rest are searched in parallel by a
+# pool of worker processes with the bound it set. Each worker searches one root choice at a time with its own
+# transposition table and move orderer, kept alive for every search the pool is used for.
+# Positions are sent as the root FEN and the move stack in uci - a worker keeps the last board it built and only
+# pushes the moves it hasn't seen.
+# A search given a deadline stops there - the workers abort the choices they're searching and the choices that
+# haven't started are cancelled.
+
+_worker = {
+	"fen": None, # root fen of the board kept by the worker
+	"moves": [], # uci moves pushed onto the board kept by the worker
+	"board": None,
+	"t_table": None,
+	"orderer": None,
+}
+
+# returns the worker's board set up for fen + moves, reusing as much of the last board as possible
+def _board(fen, moves) :
+	board = _worker["board"]
+	pushed = _worker["moves"]
+	if board is None or _worker["fen"] != fen or pushed != moves[:len(pushed)] :
+		board = chess.Board(fen)
+		pushed = []
+	for move in moves[len(pushed):] :
+		board.push_uci(move)
+	_worker["fen"] = fen
+	_worker["moves"] = list(moves)
+	_worker["board"] = board
+	return board
+
+# searches the position after choice, returning the quality as Minimax._search would and the pv after choice
+# 	the quality is None if the search was aborted at the deadline
+def _search_choice(fen, moves, choice, depth, alpha, beta, deadline, options) :
+	board = _board(fen, moves)
+	if options.pop("t_table") :
+		if _worker["t_table"] is None :
+			_worker["t_table"] = TranspositionTable()
+		t_table = _worker["t_table"]
+	else :
+		t_table = False
+	if _worker["orderer"] is None :
+		_worker["orderer"] = MoveOrderer()
+
+	board.push_uci(choice)
+	try :
+		if not any(board.generate_legal_moves()) : # game over - _search would evaluate it whatever the depth
+			depth = 0
+		minimax = ChessMinimax(board, depth, alpha=alpha, beta=beta, color=board.turn, it_deepening=False, deadline=deadline, t_table=t_table, orderer=_worker["orderer"], **options)
+	finally :
+		board.pop()
+	if minimax.aborted :
+		return (None, [], os.getpid(), minimax.num_evaled, minimax.num_q_evaled)
+	# the search of the child already passes its choices' qualities back one ply, like _search does
+	return (minimax.best_quality.packed, [move.uci() for move in minimax.pv], os.getpid(), minimax.num_evaled, minimax.num_q_evaled)
+
+class RootSplit :
+
+	def __init__(self, workers=cpu_count()) :
+		self.workers = workers
+		self.executor = ProcessPoolExecutor(workers)
+
+	# searches each of choices (moves from board) to depth with window (alpha, beta)
+	# 	options are passed through to the ChessMinimax searching each choice
+	# 	deadline (as time()) stops the search - <quality> is None for a choice that was aborted and the result None for one never started
+	# 	returns a list of (<quality>, <pv>, <worker pid>, <num_evaled>, <num_q_evaled>) for each choice
+	def search(self, board, choices, depth, alpha, beta, options, deadline=None) :
+		fen = board.root().fen()
+		moves = [move.uci() for move in board.move_stack]
+		futures = [self.executor.submit(_search_choice, fen, moves, choice.uci(), depth, alpha, beta, deadline, dict(options)) for choice in choices]
+		if deadline is not None :
+			wait(futures, timeout = max(0, deadline - time()))
+			for future in futures : # only cancels the ones that haven't started - the running ones abort themselves
+				future.cancel()
+		results = []
+		for future in futures :
+			if future.cancelled() :
+				results.append(None)
+				continue
+			(quality, pv, pid, num_evaled, num_q_evaled) = future.result()
+			results.append((quality, [chess.Move.from_uci(move) for move in pv], pid, num_evaled, num_q_evaled))
+		return results
+
+	def close(self) :
+		self.executor.shutdown()
+
+
+if __name__ == "__main__" :
+	# run tests - a root split search gives the same result as searching every choice in this process
+	import io, contextlib
+
+	fens = [
+		chess.STARTING_FEN,
+		"r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+		"5k2/2Q5/4K3/8/8/8/8/8 b - - 0 1",
+		"8/2K5/8/8/P1k5/8/8/8 b - - 6 47",
+	]
+	root_split = RootSplit(2)
+	try :
+		for fen in fens :
+			for depth in [1, 2, 3] :
+				with contextlib.redirect_stdout(io.StringIO()) :
+					board = chess.Board(fen)
+					split = ChessMinimax(board, depth, color=board.turn, root_split=root_split)
+					local = ChessMinimax(board, depth, color=board.turn)
+				assert split.best_quality == local.best_quality, f"Failed root split test: {fen} depth {depth} {split.best_quality} != {local.best_quality}"
+				assert board.fen() == fen
+
+		# mates found below a split choice keep their distance - the mating move isn't the first root choice
+		mate_fens = [
+			"k7/8/8/1K6/8/8/8/7R w - - 0 1", # +M3
+			"r2qkb1r/pp2nppp/3p4/2pNN1B1/2BnP3/3P4/PPP2PPP/R2bK2R w KQkq - 1 1", # +M3
+			"6k1/pp4p1/2p5/2bp4/8/P5Pb/1P3rrP/2BRRN1K b - - 0 1", # -M3
+			"6k1/5ppp/8/8/8/8/5PPP/1R2R1K1 w - - 0 1", # +M1 (with either rook)
+		]
+		for fen in mate_fens :
+			for options in [{}, dict(node_ordering=False, it_deepening=False)] :
+				with contextlib.redirect_stdout(io.StringIO()) :
+					board = chess.Board(fen)
+					split = ChessMinimax(board, 3, color=board.turn, root_split=root_split, **options)
+					local = ChessMinimax(board, 3, color=board.turn, **options)
+				assert split.best_quality.is_mate() and split.best_quality == local.best_quality, f"Failed root split mate test: {fen} {options} {split.best_quality} != {local.best_quality}"
+
+		# a timed search stops at its deadline even with choices still being searched by the workers
+		board = chess.Board(fens[1])
+		with contextlib.redirect_stdout(io.StringIO()) :
+			start_time = time()
+			split = ChessMinimax(board, 4, timeout=0.3, color=board.turn, root_split=root_split)
+			elapsed = time() - start_time
+		assert elapsed < 0.3 + 0.15, f"Failed root split timeout test: took {round(elapsed, 2)}s"
+		assert split.best_choice in board.legal_moves and board.fen() == fens[1]
+	finally :
+		root_split.close()
+
+	print("passed all tests\n")
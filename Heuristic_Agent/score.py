@@ -1,170 +1,116 @@
-
 import chess
-from math import inf
 
+# Scores are packed into a single number so the search can compare them directly
+# 	|val| <  MATE_BOUND  - val is the evaluation
+# 	val  == +MATE/-MATE  - position is checkmate for white/black
+# 	|val| >= MATE_BOUND  - white (val > 0) or black (val < 0) mates in MATE - |val| half moves
+# Evaluations must stay well inside (-MATE_BOUND, MATE_BOUND).
+MATE = 1000000
+MAX_MATE_PLIES = 10000
+MATE_BOUND = MATE - MAX_MATE_PLIES
+
+DRAW = 0
+
+# packed score of a checkmate delivered by color
+def checkmate(color) :
+	return MATE if color == chess.WHITE else -MATE
+
+# packed score of color mating in half_moves half moves (0 is checkmate)
+def mate_in(half_moves, color) :
+	assert 0 <= half_moves < MAX_MATE_PLIES, f"mate_in out of range: {half_moves}"
+	return MATE - half_moves if color == chess.WHITE else half_moves - MATE
+
+# if val represents a mate in or checkmate, increases absolute value of half moves by 1
+# otherwise returns val unchanged
+def inc(val) :
+	if val >= MATE_BOUND :
+		return val - 1
+	if val <= -MATE_BOUND :
+		return val + 1
+	return val
+
+# returns true if val represents any kind of checkmate
+def is_mate(val) :
+	return val >= MATE_BOUND or val <= -MATE_BOUND
+
+
+# Thin wrapper around a packed score for display and tests - the search only uses packed values
 class Score :
 
-	# cached score objects (like small java Integers)
-	# initialized after class definition
-	WHITE_CHECKMATE = None
-	BLACK_CHECKMATE = None
-	NUM_CACHED_MATE_IN = 16
-	WHITE_MATE_IN = None
-	BLACK_MATE_IN = None
-	ZERO = None
-
-	# types of scores
-	T_NORMAL = 0
-	T_CHECKMATE = 1
-	T_MATE_IN = 2
-
-	# if mate is False and val is finite         - val is the evaluation
-	# if mate is False and val is infinite       - position is checkmate for white (val = +inf) or black (val = -inf)
-	# if mate is True and val is finite non-zero - val is the number of moves to mate for white (val > 0) or black (val < 0)
-	# if mate is True and val = 0                - Illegal state - undefined behavior
-	# if mate is True and val is infinite        - Illegal state - undefined behavior
-	#
-	# this constructor should not be called from outside of this file - use the factory methods:
+	# this constructor takes a packed score - use the factory methods to build a score from parts:
 	# 	checkmate, mate_in, draw, score
-	def __init__(self, val, mate = False) :
-		assert not mate or (val != -inf and val != 0 and val != inf), f"Score initialized with an illegal state: <{self.val}, {self.mate}>"
-		self.val = val
-		self._is_mate = mate
-
-		if not self._is_mate and self.val != -inf and self.val != inf :
-			self.type = Score.T_NORMAL
-		elif not self._is_mate and (self.val == -inf or self.val == inf) :
-			self.type = Score.T_CHECKMATE
-		elif self._is_mate and self.val != -inf and self.val != inf and self.val != 0 :
-			self.type = Score.T_MATE_IN
-		else :
-			assert False, f"Internal Error - score initialized with invalid state: <{self.val}, {self._is_mate}>"
+	def __init__(self, packed) :
+		self.packed = packed
 
 	# if self represents a mate in or checkmate, increases absolute value of half moves by 1
 	# otherwise returns self unchanged
 	def inc(self) :
-		if self.type == Score.T_NORMAL :
-			return self
-		elif self.type == Score.T_MATE_IN :
-			color = chess.WHITE if self.val > 0 else chess.BLACK
-			return Score.mate_in(abs(self.val) + 1, color)
-		elif self.type == Score.T_CHECKMATE :
-			return Score.WHITE_MATE_IN[1] if self.val == inf else Score.BLACK_MATE_IN[1]
-		else :
-			assert False , f"Internal Error - bad type: {self.type}"
+		return Score(inc(self.packed))
 
 	# returns true if score represents any kind of checkmate
 	def is_mate(self) :
-		return self.type == Score.T_CHECKMATE or self.type == Score.T_MATE_IN
+		return is_mate(self.packed)
 
 	@staticmethod
 	def checkmate(color) :
-		return Score.WHITE_CHECKMATE if color == chess.WHITE else Score.BLACK_CHECKMATE
+		return Score(checkmate(color))
 
 	@staticmethod
 	def mate_in(half_moves, color) :
-		if half_moves < Score.NUM_CACHED_MATE_IN :
-			cached_mates = Score.WHITE_MATE_IN if color == chess.WHITE else Score.BLACK_MATE_IN
-			return cached_mates[half_moves]
-		else :
-			val = half_moves if color == chess.WHITE else -half_moves
-			return Score(val, mate=True)
-	
+		return Score(mate_in(half_moves, color))
+
 	@staticmethod
 	def draw() :
-		return Score.ZERO
+		return Score(DRAW)
 
 	@staticmethod
 	def score(val) :
-		if val == 0 :
-			return Score.ZERO
-		else :
-			return Score(val)
-		
+		assert -MATE_BOUND < val < MATE_BOUND, f"Score out of range: {val}"
+		return Score(val)
+
+	# scores compare equal to other scores or to packed values
+	@staticmethod
+	def _packed(other) :
+		return other.packed if isinstance(other, Score) else other
+
 	def __eq__(self, other) :
 		if None == other :
 			return False
-		return self.val == other.val and self._is_mate == other._is_mate
+		return self.packed == Score._packed(other)
 
 	def __ne__(self, other) :
 		if None == other :
 			return True
-		return self.val != other.val or self._is_mate != other._is_mate
+		return self.packed != Score._packed(other)
 
 	def __lt__(self, other) :
-		if not self._is_mate and not other._is_mate :
-			return self.val < other.val
-		if self._is_mate and other._is_mate :
-			if (self.val < 0 and other.val < 0) or (self.val > 0 and other.val > 0) :
-				return self.val > other.val
-			else :
-				return self.val < other.val
-		elif self._is_mate :
-			return (self.val < 0 or other.val == inf) and other.val != -inf
-		else :
-			return (other.val > 0 or self.val == -inf) and self.val != inf
+		return self.packed < Score._packed(other)
 
 	def __le__(self, other) :
-		if not self._is_mate and not other._is_mate :
-			return self.val <= other.val
-		if self._is_mate and other._is_mate :
-			if (self.val < 0 and other.val < 0) or (self.val > 0 and other.val > 0) :
-				return self.val >= other.val
-			else :
-				return self.val <= other.val
-		elif self._is_mate :
-			return (self.val < 0 or other.val == inf) and other.val != -inf
-		else :
-			return (other.val > 0 or self.val == -inf) and self.val != inf
+		return self.packed <= Score._packed(other)
 
 	def __gt__(self, other) :
-		if not self._is_mate and not other._is_mate :
-			return self.val > other.val
-		if self._is_mate and other._is_mate :
-			if (self.val < 0 and other.val < 0) or (self.val > 0 and other.val > 0) :
-				return self.val < other.val
-			else :
-				return self.val > other.val
-		elif self._is_mate :
-			return (self.val > 0 or other.val == -inf) and other.val != inf
-		else :
-			return (other.val < 0 or self.val == inf) and self.val != -inf
+		return self.packed > Score._packed(other)
 
 	def __ge__(self, other) :
-		if not self._is_mate and not other._is_mate :
-			return self.val >= other.val
-		if self._is_mate and other._is_mate :
-			if (self.val < 0 and other.val < 0) or (self.val > 0 and other.val > 0) :
-				return self.val <= other.val
-			else :
-				return self.val >= other.val
-		elif self._is_mate :
-			return (self.val > 0 or other.val == -inf) and other.val != inf
-		else :
-			return (other.val < 0 or self.val == inf) and self.val != -inf
+		return self.packed >= Score._packed(other)
+
+	def __hash__(self) :
+		return hash(self.packed)
 
 	def __str__(self) :
 		sign = ''
-		if self.val > 0 :
+		if self.packed > 0 :
 			sign = '+'
-		elif self.val < 0 :
+		elif self.packed < 0 :
 			sign = '-'
-		mate = 'M' if self._is_mate or self.val == -inf or self.val == inf else ''
-		val_str = '0' if self.val == -inf or self.val == inf else str(abs(self.val))
-		return f"{sign}{mate}{val_str}"
+		if is_mate(self.packed) :
+			return f"{sign}M{MATE - abs(self.packed)}"
+		return f"{sign}{round(abs(self.packed), 2)}" # evaluations are in pawns - shown to the centipawn
 
 	def __repr__(self) :
 		return str(self)
 
-# initialize cached Score objects
-Score.WHITE_CHECKMATE = Score(inf)
-Score.BLACK_CHECKMATE = Score(-inf)
-Score.WHITE_MATE_IN = {i: Score( i, mate=True) for i in range(1,Score.NUM_CACHED_MATE_IN)}
-Score.BLACK_MATE_IN = {i: Score(-i, mate=True) for i in range(1,Score.NUM_CACHED_MATE_IN)}
-Score.WHITE_MATE_IN[0] = Score.WHITE_CHECKMATE
-Score.BLACK_MATE_IN[0] = Score.BLACK_CHECKMATE
-Score.ZERO = Score(0)
-
 if __name__ == "__main__" : 
 	# run tests
 
@@ -228,6 +174,8 @@ if __name__ == "__main__" :
 	for a in [w1, w2, wpi, w10, draw, b1, b2, bpi, b10] :
 		assert a.inc() == a, f"Failed score test: ({a}).inc() ==> {a.inc()}"
 
+	assert [str(a) for a in [wmi[3], bmi[2], wcm, draw, w10, Score.score(-0.32141287500000004)]] == ["+M3", "-M2", "+M0", "0", "+10", "-0.32"]
+
 	print("passed all tests\n")
 
 	
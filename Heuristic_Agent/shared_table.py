@@ -0,0 +1,151 @@
+import struct
+from multiprocessing import shared_memory
+import chess
+
+from transposition_table import TranspositionTable, DEFAULT_TABLE_SIZE, EXACT
+
+# Transposition table in shared memory so that several processes can search with the same table
+# 	Buckets and replacement work the same way as TranspositionTable, but entries are packed into a flat
+# 	shared_memory buffer instead of being python tuples, and the best move must be a chess.Move.
+# 	Slots are written without locks - the stored key is xor'd with the rest of the entry so an entry torn
+# 	by two processes writing at once doesn't match any key and just reads as a miss. The slot is only read once -
+# 	the data is decoded from the same words the key was checked against.
+
+_HEADER = struct.Struct("<Q") # <age>
+_WORDS = struct.Struct("<QQQ") # entry as 3 words to check the key
+_KEY = struct.Struct("<Q")
+_PAYLOAD = struct.Struct("<QQ") # _DATA as the 2 words xor'd into the key
+_DATA = struct.Struct("<dhHHBx") # <score>, <depth>, <best move>, <age>, <bound>
+ENTRY_SIZE = _KEY.size + _DATA.size
+
+def _pack_move(move) :
+	if move is None :
+		return 0
+	return move.from_square | (move.to_square << 6) | ((move.promotion or 0) << 12)
+
+def _unpack_move(packed) :
+	if packed == 0 :
+		return None
+	return chess.Move(packed & 63, (packed >> 6) & 63, (packed >> 12) or None)
+
+class SharedTranspositionTable(TranspositionTable) :
+
+	# creates a new table when name is None, otherwise attaches to the table created with that name
+	# 	only the process that created the table ages it - new_search() in the other processes picks up its age
+	def __init__(self, size=DEFAULT_TABLE_SIZE, name=None) :
+		assert size > 0 and (size & (size - 1)) == 0, "SharedTranspositionTable size must be a power of 2"
+		self.size = size
+		self.mask = size - 1
+		self.owner = name is None
+		if self.owner :
+			self.shm = shared_memory.SharedMemory(create=True, size=_HEADER.size + 2 * size * ENTRY_SIZE)
+			self.shm.buf[:] = bytes(len(self.shm.buf))
+		else :
+			self.shm = shared_memory.SharedMemory(name=name)
+		self.name = self.shm.name
+		self.buf = self.shm.buf
+		self.age = _HEADER.unpack_from(self.buf, 0)[0]
+
+	def _read(self, offset, key) :
+		(stored, w1, w2) = _WORDS.unpack_from(self.buf, offset)
+		if stored ^ w1 ^ w2 != key :
+			return None
+		(value, depth, move, age, bound) = _DATA.unpack(_PAYLOAD.pack(w1, w2))
+		return (key, value, depth, bound, _unpack_move(move), age)
+
+	def _offset(self, key) :
+		return _HEADER.size + 2 * (key & self.mask) * ENTRY_SIZE
+
+	# returns the entry stored for key or None
+	def probe(self, key) :
+		offset = self._offset(key)
+		entry = self._read(offset, key)
+		if entry is None :
+			entry = self._read(offset + ENTRY_SIZE, key)
+		return entry
+
+	# same replacement as TranspositionTable.store - move must be a chess.Move or None
+	def store(self, key, value, depth, bound=EXACT, move=None) :
+		offset = self._offset(key)
+		age = self.age & 0xFFFF
+		data = _DATA.pack(value, depth, _pack_move(move), age, bound)
+		(deep_key, w1, w2) = _WORDS.unpack_from(self.buf, offset)
+		deep_key ^= w1 ^ w2
+		if deep_key != key :
+			(_, deep_depth, _, deep_age, _) = _DATA.unpack(_PAYLOAD.pack(w1, w2))
+			if (w1 or w2) and depth < deep_depth and deep_age == age : # keep the deep slot
+				offset += ENTRY_SIZE
+		(w1, w2) = _PAYLOAD.unpack(data)
+		_KEY.pack_into(self.buf, offset, key ^ w1 ^ w2)
+		self.buf[offset + _KEY.size : offset + ENTRY_SIZE] = data
+
+	def new_search(self) :
+		if self.owner :
+			self.age += 1
+			_HEADER.pack_into(self.buf, 0, self.age)
+		else :
+			self.age = _HEADER.unpack_from(self.buf, 0)[0]
+
+	def clear(self) :
+		self.buf[_HEADER.size:] = bytes(len(self.buf) - _HEADER.size)
+		if self.owner :
+			self.age = 0
+			_HEADER.pack_into(self.buf, 0, 0)
+
+	# detaches from the table - the process that created it also frees it
+	def close(self) :
+		self.buf.release()
+		self.shm.close()
+		if self.owner :
+			self.shm.unlink()
+
+
+def _store_in_child(name, size, key, move) :
+	table = SharedTranspositionTable(size, name=name)
+	table.new_search()
+	table.store(key, 2.5, 3, EXACT, move)
+	table.close()
+
+if __name__ == "__main__" :
+	# run tests - entries round trip through the packed buffer and are seen by other processes
+	import multiprocessing
+	from transposition_table import LOWER, UPPER
+
+	table = SharedTranspositionTable(1 << 4)
+	try :
+		key = 0x123456789ABCDEF0
+		table.store(key, -1.25, 4, LOWER, chess.Move.from_uci("e7e8q"))
+		assert table.probe(key) == (key, -1.25, 4, LOWER, chess.Move.from_uci("e7e8q"), 0)
+		assert table[(key, 4)] == -1.25 and table[(key, 5)] is None
+		assert (key, 4) in table and key + 1 not in table
+
+		# a shallower entry in the same bucket goes in the recent slot, a deeper one replaces the deep slot
+		other = key + (1 << 4)
+		table.store(other, 999990, 2, UPPER, None)
+		assert table.probe(key)[2] == 4 and table.probe(other) == (other, 999990, 2, UPPER, None, 0)
+		table.store(other, 3.0, -1)
+		assert table.probe(key)[2] == 4 and table[other] == 3.0
+
+		# after aging the deep slot can be replaced by anything
+		table.new_search()
+		third = key + (2 << 4)
+		table.store(third, 0.5, 0)
+		assert table.probe(key) is None and table[third] == 0.5
+
+		# entries stored by another process are seen here
+		child = multiprocessing.Process(target=_store_in_child, args=(table.name, table.size, 42, chess.Move.from_uci("g1f3")))
+		child.start()
+		child.join()
+		assert table.probe(42) == (42, 2.5, 3, EXACT, chess.Move.from_uci("g1f3"), 1)
+
+		# an entry whose data was overwritten without its key (a torn write) reads as a miss
+		offset = table._offset(42)
+		table.buf[offset + _KEY.size : offset + ENTRY_SIZE] = _DATA.pack(7.0, 9, 0, 1, EXACT)
+		assert table.probe(42) is None
+
+		table.clear()
+		assert table.probe(42) is None and table.probe(third) is None
+	finally :
+		table.close()
+
+	print("passed all tests\n")
@@ -13,6 +13,8 @@ if __name__ == "__main__" :
 	parser = argparse.ArgumentParser(description='Minimax test bench')
 	parser.add_argument('-t', '-tests', dest='tests', type = int, action='store', nargs = '*', default=None) # 1 indexed
 	parser.add_argument('-np', '-no_prune', dest='prune', action='store_false')
+	parser.add_argument('-pvs', dest='pvs', action='store_true') # principal variation search, compared against plain alpha-beta
+	parser.add_argument('-a', '-aspiration', dest='aspiration', type = float, action='store', default=None) # aspiration window half width
 	parser.add_argument('-v', '-verbose', dest='tests_verbose', action='store_true')
 	parser.add_argument('-vv', '-vverbose', dest='minimax_verbose', action='store_true')
 	args = parser.parse_args()
@@ -22,20 +24,41 @@ if __name__ == "__main__" :
 	pass_tests = 0
 	fail_tests = []
 	total_tests = 0
+	compare_plain = args.pvs or args.aspiration is not None
+	num_evaled = 0
+	plain_num_evaled = 0
 	target_tests = [(t-1, TestCase.all_tests[t-1]) for t in args.tests] if args.tests else enumerate(TestCase.all_tests)
 	for (i, test) in target_tests :
 		if args.tests_verbose : print(f"Running test {i+1}\n")
 
 		chess_minimax = None
+		plain_minimax = None
 		if isinstance(test, ArrTestCase) :
-			minimax = ArrMinimax(test, pruning = args.prune, verbose = args.minimax_verbose)
+			minimax = ArrMinimax(test, pruning = args.prune, pvs = args.pvs, verbose = args.minimax_verbose)
+			if compare_plain :
+				plain_minimax = ArrMinimax(test, pruning = args.prune)
 		elif isinstance(test, TupleTestCase) :
-			minimax = TupMinimax(test, pruning = args.prune, verbose = args.minimax_verbose, use_score=test.use_score)
+			minimax = TupMinimax(test, pruning = args.prune, verbose = args.minimax_verbose, use_score=test.use_score, quiescence=test.quiescence, pvs=args.pvs, aspiration=args.aspiration)
+			if compare_plain :
+				plain_minimax = TupMinimax(test, pruning = args.prune, use_score=test.use_score, quiescence=test.quiescence)
 			if test.fen : # run a chessminimax with this to confirm
 				board = chess.Board(test.fen)
 				chess_minimax = ChessMinimax(board, test.depth, color=board.turn, pruning = args.prune, verbose = args.minimax_verbose)
 
-		if test.res is None : # Test is unknown
+		num_evaled += minimax.num_evaled
+		if plain_minimax :
+			plain_num_evaled += plain_minimax.num_evaled
+
+		if plain_minimax and plain_minimax.best_quality != minimax.best_quality : # pvs / aspiration changed the result
+			fail_tests.append(i)
+			if args.tests_verbose : print()
+			print(f"Failed test {i+1} against plain alpha-beta")
+			print(f"\t{test}")
+			print(f"\tactual={minimax.best_quality}")
+			print(f"\tplain = {plain_minimax.best_quality}")
+			if args.tests_verbose : print("FAIL\n--------------------------")
+			else : print()
+		elif test.res is None : # Test is unknown
 			if args.tests_verbose : print()
 			print(f"Test {i+1} unknown (depth={test.depth}) {'< '+test.fen+' >' if isinstance(test, TupleTestCase) and test.fen else ''}")
 			print()
@@ -93,4 +116,6 @@ if __name__ == "__main__" :
 	print(f"Ran {total_tests} tests")
 	print(f"Passed {pass_tests}/{pass_tests+len(fail_tests)}")
 	print(f"{(round(pass_tests/(pass_tests+len(fail_tests))*10000))/100 if pass_tests+len(fail_tests) != 0 else 'nil'}%")
+	if compare_plain :
+		print(f"num_evaled = {num_evaled}, plain alpha-beta num_evaled = {plain_num_evaled} ({round(num_evaled/plain_num_evaled*10000)/100 if plain_num_evaled != 0 else 'nil'}%)")
 
@@ -4,14 +4,15 @@ from math import inf
 import chess
 
 from minimax import Minimax
+import score
 from score import Score
 
 
 class ArrMinimax(Minimax) :
-	def __init__(self, test_case, pruning=True, verbose=False):
+	def __init__(self, test_case, pruning=True, pvs=False, verbose=False):
 		self.test_case = test_case
 		self.stack = [test_case.arr]
-		super().__init__(test_case.depth, maxing = test_case.maxing, pruning=pruning, it_deepening=False, verbose=verbose)
+		super().__init__(test_case.depth, maxing = test_case.maxing, pruning=pruning, it_deepening=False, pvs=pvs, verbose=verbose)
 
 	def children(self) :
 		return self.stack[-1]
@@ -41,17 +42,22 @@ class ArrMinimax(Minimax) :
 		return str(self.stack[-1])
 
 class TupMinimax(Minimax) :
-	def __init__(self, test_case, use_score = False, pruning=True, verbose=False):
+	def __init__(self, test_case, use_score = False, pruning=True, quiescence=False, pvs=False, aspiration=None, verbose=False):
 		self.test_case = test_case
 		self.stack = [test_case.tup]
 		self.use_score = use_score
-		self._min_eval = Score.checkmate(chess.BLACK) if use_score else -inf
-		self._max_eval = Score.checkmate(chess.WHITE) if use_score else inf
-		super().__init__(test_case.depth, maxing = test_case.maxing, pruning=pruning, verbose=verbose)
+		self._min_eval = score.checkmate(chess.BLACK) if use_score else -inf
+		self._max_eval = score.checkmate(chess.WHITE) if use_score else inf
+		super().__init__(test_case.depth, maxing = test_case.maxing, pruning=pruning, quiescence=quiescence, pvs=pvs, aspiration=aspiration, verbose=verbose)
+		if use_score :
+			self.best_quality = Score(self.best_quality) # the search works on packed scores
 
 	def children(self) :
 		return list(self.stack[-1][1]) if len(self.stack[-1]) > 1 else []
 
+	def quiescence_children(self) :
+		return self.children()
+
 	def eval(self) :
 		return self.stack[-1][0]
 
@@ -71,7 +77,7 @@ class TupMinimax(Minimax) :
 
 	def inc_eval(self, e) :
 		if self.use_score :
-			return e.inc()
+			return score.inc(e)
 		else :
 			return e
 
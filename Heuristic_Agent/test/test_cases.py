@@ -60,7 +60,7 @@ class ArrTestCase(TestCase) :
 
 class TupleTestCase(TestCase) :
 
-	def __init__(self, tup, res, maxing, depth = inf, use_score = False, fen = None):
+	def __init__(self, tup, res, maxing, depth = inf, use_score = False, fen = None, quiescence = False):
 		super().__init__(res, maxing)
 		if tup == None :
 			assert fen != None , "TupleTestCase may be specified with tup=None to delay generation till usage, but fen must be specified"
@@ -68,6 +68,7 @@ class TupleTestCase(TestCase) :
 		self.depth = depth
 		self.use_score = use_score
 		self.fen = fen
+		self.quiescence = quiescence # search the rest of the tree past depth as quiescence choices
 
 	@property
 	def tup(self) :
@@ -157,6 +158,27 @@ ArrTestCase([
 	[[0]] # 0
 ], 9, maxing=True)
 
+#######################################
+###### Quiescence test cases
+#######################################
+
+# searched to depth 1, the rest of the tree is quiescence choices that may be stood pat on
+TupleTestCase((0, (
+	(5, ((-10,), (6,))), # min(5, -10, 6) = -10
+	(3, ((4,),)), # min(3, 4) = 3
+)), 3, maxing=True, depth=1, quiescence=True)
+
+TupleTestCase((0, (
+	(-2, ((8, ((7,),)),)), # max(-2, min(8, 7)) = 7
+	(1, ((0,),)), # max(1, 0) = 1
+)), 1, maxing=False, depth=1, quiescence=True)
+
+# a checkmate at the horizon has no quiescence choices - it keeps its mate distance like a plain leaf
+TupleTestCase((0, (
+	(5, ((4,),)),
+	(Score.checkmate(chess.WHITE).packed,),
+)), Score.mate_in(1, chess.WHITE), maxing=True, depth=1, use_score=True, quiescence=True)
+
 #######################################
 ###### Random test cases
 #######################################
@@ -1,43 +1,87 @@
 
+DEFAULT_TABLE_SIZE = 1 << 18 # number of buckets - must be a power of 2
 
-
+# bound types of stored scores
+EXACT = 0 # score is the true minimax value
+LOWER = 1 # search failed high - true value >= score
+UPPER = 2 # search failed low  - true value <= score
 
 class TranspositionTable :
-	
-	def __init__(self) :
-		# self.table is indexed by <fen> and contains (<score>, <depth>)
-		self.table = {}
-	
-	# id is <fen> or tuple of (<fen>, <required_depth>)
-	#     if fen is in table, returns score only if required_depth <= existing_depth or
-	#     id is just specified as fen
+
+	# The table is a fixed number of buckets indexed by the low bits of a 64 bit zobrist key.
+	# Each bucket has two slots:
+	# 	deep   - depth-preferred : only replaced by an entry searched at least as deep, or by any entry
+	# 	         once it was stored by an earlier search
+	# 	recent - always-replace  : takes every entry that wasn't deep enough for the deep slot
+	# Entries are tuples of (<key>, <score>, <depth>, <bound>, <best move>, <age>) so memory use is fixed by size
+	# The table can be kept between searches - new_search() ages the entries instead of clearing them
+	def __init__(self, size=DEFAULT_TABLE_SIZE) :
+		assert size > 0 and (size & (size - 1)) == 0, "TranspositionTable size must be a power of 2"
+		self.size = size
+		self.mask = size - 1
+		self.deep = [None] * size
+		self.recent = [None] * size
+		self.age = 0 # number of searches the table has been used for
+
+	# returns the entry stored for key or None
+	def probe(self, key) :
+		i = key & self.mask
+		entry = self.deep[i]
+		if entry is not None and entry[0] == key :
+			return entry
+		entry = self.recent[i]
+		if entry is not None and entry[0] == key :
+			return entry
+		return None
+
+	# id is <key> or tuple of (<key>, <required_depth>)
+	#     if key is in table, returns score only if required_depth <= existing_depth or
+	#     id is just specified as key
+	#     the bound of the score is not checked - use probe() for searched results
 	def __getitem__(self, id) :
 		if type(id) == tuple :
-			if id[0] in self.table :
-				score = self.table[id[0]]
-				return score[0] if score[1] >= id[1] else None
-			else : 
-				return None
-		elif type(id) == str :
-			return self.table[id[0]] if id[0] in self.table else None
+			entry = self.probe(id[0])
+			return entry[1] if entry is not None and entry[2] >= id[1] else None
+		elif type(id) == int :
+			entry = self.probe(id)
+			return entry[1] if entry is not None else None
 		else :
-			raise ValueError("id must be tuple or str")
+			raise ValueError("id must be tuple or int")
 
-	# id is tuple of (<fen>, <depth>)
-	# value is the score to be stored
-	#     depth 0 implies the score is the result of a direct eval
-	# value is always added to table (even if value has lower depth)
-	# this should be acceptable since eval will only occur if depth is not large enough
+	# id is tuple of (<key>, <depth>)
+	# value is the exact score to be stored
+	#     depth -1 implies the score is the result of a direct eval
 	def __setitem__(self, id, value) :
-		self.table[id[0]] = (value, id[1])
+		self.store(id[0], value, id[1])
 
-	# id is <fen> or tuple of (<fen>, <required_depth>)
-	#     true if fen is in table and existing depth >= required_depth
+	# value is always added to table - it goes in the deep slot if it was searched at least
+	# as deep as what's there (or replaces the same position), otherwise in the recent slot
+	def store(self, key, value, depth, bound=EXACT, move=None) :
+		i = key & self.mask
+		entry = (key, value, depth, bound, move, self.age)
+		deep = self.deep[i]
+		if deep is None or deep[0] == key or depth >= deep[2] or deep[5] != self.age :
+			self.deep[i] = entry
+		else :
+			self.recent[i] = entry
+
+	# id is <key> or tuple of (<key>, <required_depth>)
+	#     true if key is in table and existing depth >= required_depth
 	def __contains__(self, id) :
 		if type(id) == tuple :
-			return id[0] in self.table and self.table[id[0]][1] >= id[1]
-		elif type(id) == str :
-			return id[0] in self.table
+			entry = self.probe(id[0])
+			return entry is not None and entry[2] >= id[1]
+		elif type(id) == int :
+			return self.probe(id) is not None
 		else :
-			raise ValueError("id must be tuple or str")
+			raise ValueError("id must be tuple or int")
+
+	# called at the start of every search - entries stored before it are still probed, but the
+	# deep slot no longer protects them from being replaced
+	def new_search(self) :
+		self.age += 1
 
+	def clear(self) :
+		self.deep = [None] * self.size
+		self.recent = [None] * self.size
+		self.age = 0
@@ -33,11 +33,23 @@ def exponential_regression_eval(x, y, xi, proportional=False) :
 	(a, b) = linear_regression(x, [log(yi) for yi in y], proportional=proportional)
 	return exp(b) * exp(a * xi)
 
+# returns the number of seconds to spend on a move given the time left on the game clock and the increment
+# 	the clock is spread over moves_to_go more moves, the increment is spent as it's earned and overhead
+# 	is kept back for the latency between the search ending and the move being played
+def move_time_budget(clock, increment=0, moves_to_go=30, overhead=0.05) :
+	budget = clock / moves_to_go + increment - overhead
+	return max(0.01, min(budget, clock / 2 - overhead))
+
 
 if __name__ == "__main__" :
 	x = [1,2,3,4,5]
 	y = [2,4,8,16,32]
 
 	assert abs(exponential_regression_eval(x,y,10) - 1024) < 0.01
+
+	assert abs(move_time_budget(60) - 1.95) < 0.001
+	assert abs(move_time_budget(60, 2) - 3.95) < 0.001
+	assert move_time_budget(1, 5) < 0.5 # never more than half the clock
+	assert move_time_budget(0) > 0
 	print("Passed test (this test is very basic)")
 
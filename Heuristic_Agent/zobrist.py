@@ -0,0 +1,71 @@
+import chess
+from chess.polyglot import POLYGLOT_RANDOM_ARRAY, ZobristHasher
+
+# Incremental zobrist hashing on top of python-chess's polyglot hasher
+# 	The keys produced are identical to chess.polyglot.zobrist_hash(board), but
+# 	push() only touches the squares changed by a move instead of rehashing all
+# 	of the pieces on the board.
+
+_hasher = ZobristHasher(POLYGLOT_RANDOM_ARRAY)
+
+TURN_KEY = POLYGLOT_RANDOM_ARRAY[780]
+
+# polyglot orders pieces as <black pawn>, <white pawn>, <black knight>, ...
+def piece_key(piece_type, color, square) :
+	return POLYGLOT_RANDOM_ARRAY[64 * ((piece_type - 1) * 2 + color) + square]
+
+# returns the zobrist hash of board computed from scratch
+def zobrist_hash(board) :
+	return _hasher(board)
+
+# pushes move onto board and returns the hash of the resulting position
+# 	key must be the hash of board before the move is made
+def push(board, key, move) :
+	color = board.turn
+	from_sq, to_sq = move.from_square, move.to_square
+	piece_type = board.piece_type_at(from_sq)
+
+	key ^= TURN_KEY ^ _hasher.hash_castling(board) ^ _hasher.hash_ep_square(board)
+	key ^= piece_key(piece_type, color, from_sq)
+
+	if board.is_castling(move) :
+		rank = chess.square_rank(from_sq)
+		if chess.square_file(to_sq) > chess.square_file(from_sq) :
+			rook_from, rook_to, king_to = chess.square(7, rank), chess.square(5, rank), chess.square(6, rank)
+		else :
+			rook_from, rook_to, king_to = chess.square(0, rank), chess.square(3, rank), chess.square(2, rank)
+		key ^= piece_key(chess.ROOK, color, rook_from) ^ piece_key(chess.ROOK, color, rook_to)
+		key ^= piece_key(chess.KING, color, king_to)
+	else :
+		captured = board.piece_type_at(to_sq)
+		if captured is not None :
+			key ^= piece_key(captured, not color, to_sq)
+		elif piece_type == chess.PAWN and to_sq == board.ep_square :
+			key ^= piece_key(chess.PAWN, not color, to_sq - 8 if color == chess.WHITE else to_sq + 8)
+		key ^= piece_key(move.promotion or piece_type, color, to_sq)
+
+	board.push(move)
+	return key ^ _hasher.hash_castling(board) ^ _hasher.hash_ep_square(board)
+
+
+if __name__ == "__main__" :
+	# run tests - play random games and compare the incremental hash against a full rehash
+	import random
+	random.seed(1234)
+
+	fens = [
+		chess.STARTING_FEN,
+		"r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+		"r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+		"8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+	]
+	for fen in fens :
+		for _ in range(50) :
+			board = chess.Board(fen)
+			key = zobrist_hash(board)
+			while not board.is_game_over() and len(board.move_stack) < 100 :
+				move = random.choice(list(board.legal_moves))
+				key = push(board, key, move)
+				assert key == zobrist_hash(board), f"Failed zobrist test: {board.fen()} after {move}"
+
+	print("passed all tests\n")
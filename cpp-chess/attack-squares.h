@@ -1,28 +0,0 @@
-#pragma once
-
-#include <stdint.h>
-#include <stdio.h>
-#include <vector>
-
-struct _AttackSquares;
-extern _AttackSquares AttackSquares;
-#include "board.h"
-
-using namespace std;
-
-#define attack_paths(square_id, piece) (AttackSquares._attack_squares[square_id][piece])
-#define pawn_attack_squares(square_id, color) (AttackSquares._pawn_attack_squares[square_id][((color) >> 3) - 1])
-#define pawn_move_path(square_id, color) (AttackSquares._pawn_move_squares[square_id][((color) >> 3) - 1])
-#define enpass_capture_square(enpass_square) (AttackSquares._enpass_capture_square[enpass_square])
-
-struct _AttackSquares {
-	
-	vector<vector<vector<vector<uint8_t> > > > _attack_squares;
-	vector<vector<vector<uint8_t> > > _pawn_attack_squares;
-	vector<vector<vector<uint8_t> > > _pawn_move_squares;
-	vector<uint8_t> _enpass_capture_square;
-
-
-	_AttackSquares();
-
-};
\ No newline at end of file
@@ -0,0 +1,57 @@
+#include <stdint.h>
+#include <stdio.h>
+
+#include "board.h"
+#include "bitboard.h"
+
+using namespace std;
+
+// rank and file steps of each ray direction - in the order of the DIR_ defines
+constexpr int8_t ray_dr[] = {1, 0, 1,  1, -1,  0, -1, -1};
+constexpr int8_t ray_df[] = {0, 1, 1, -1,  0, -1, -1,  1};
+
+constexpr int8_t knight_dr[] = {-2, -2, -1, -1,  1, 1, 2,  2};
+constexpr int8_t knight_df[] = { 1, -1, -2,  2, -2, 2, 1, -1};
+
+// set of the square rank + dr, file + df - empty if it is off the board
+static constexpr uint64_t step(uint8_t square, int8_t dr, int8_t df) {
+	int8_t r = rank(square) + dr;
+	int8_t f = file(square) + df;
+	if(r < 0 || r >= 8 || f < 0 || f >= 8) {
+		return 0;
+	}
+	return bit(square_id(r, f));
+}
+
+constexpr _Bitboards::_Bitboards() {
+
+	for(uint8_t sq = 0; sq < 64; sq++) {
+		for(uint8_t d = 0; d < 8; d++) {
+			_knight_attacks[sq] |= step(sq, knight_dr[d], knight_df[d]);
+			_king_attacks[sq] |= step(sq, ray_dr[d], ray_df[d]);
+		}
+		_pawn_attacks[0][sq] = step(sq, 1, -1) | step(sq, 1, 1);
+		_pawn_attacks[1][sq] = step(sq, -1, -1) | step(sq, -1, 1);
+
+		for(uint8_t d = 0; d < 8; d++) {
+			for(int8_t r = rank(sq) + ray_dr[d], f = file(sq) + ray_df[d]; r >= 0 && r < 8 && f >= 0 && f < 8; r += ray_dr[d], f += ray_df[d]) {
+				_rays[d][sq] |= bit(square_id(r, f));
+			}
+		}
+	}
+
+	// between and line are built from the rays - opposite directions are 4 apart
+	for(uint8_t a = 0; a < 64; a++) {
+		for(uint8_t d = 0; d < 8; d++) {
+			uint64_t rest = _rays[d][a];
+			uint8_t b;
+			for_each_square(b, rest) {
+				_between[a][b] = _rays[d][a] & _rays[(d + 4) % 8][b];
+				_line[a][b] = _rays[d][a] | _rays[(d + 4) % 8][a] | bit(a);
+			}
+		}
+	}
+
+}
+
+constexpr _Bitboards Bitboards;
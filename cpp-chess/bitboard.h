@@ -0,0 +1,80 @@
+#pragma once
+
+#include <stdint.h>
+#include <stdio.h>
+
+struct _Bitboards;
+extern const _Bitboards Bitboards;
+#include "board.h"
+
+using namespace std;
+
+/*
+	A bitboard is a 64 bit set of squares - bit n is set when the square with square_id n is in the set
+	(bit(square_id) is defined in board.h next to the other square macros)
+
+	Slider attacks use ray tables rather than magic numbers or PEXT: the ray from a square in one direction is
+	looked up, and everything past the first piece on it is cut off by removing the ray of the same direction
+	from that piece. The first piece is the lowest set bit for directions going up the board and the highest
+	set bit for directions going down.
+
+	The tables are built by a constexpr constructor, so they are computed by the compiler and stored in the
+	binary as plain arrays - nothing runs when the library is loaded.
+*/
+
+#define lsb(bb) ((uint8_t) __builtin_ctzll(bb))        // lowest square in a non-empty bitboard
+#define msb(bb) ((uint8_t) (63 - __builtin_clzll(bb))) // highest square in a non-empty bitboard
+#define popcount(bb) __builtin_popcountll(bb)
+
+// iterates sq over the squares of bb from lowest to highest
+#define for_each_square(sq, bb) for(uint64_t _bb = (bb); _bb != 0 && (((sq) = lsb(_bb)), true); _bb &= _bb - 1)
+
+// ray directions - the first four go up the board (increasing square_id)
+#define DIR_NORTH      0
+#define DIR_EAST       1
+#define DIR_NORTH_EAST 2
+#define DIR_NORTH_WEST 3
+#define DIR_SOUTH      4
+#define DIR_WEST       5
+#define DIR_SOUTH_WEST 6
+#define DIR_SOUTH_EAST 7
+
+#define knight_attacks(square_id) (Bitboards._knight_attacks[square_id])
+#define king_attacks(square_id) (Bitboards._king_attacks[square_id])
+#define pawn_attacks(square_id, color) (Bitboards._pawn_attacks[((color) >> 3) - 1][square_id]) // squares a pawn of color on square_id attacks
+#define ray(square_id, direction) (Bitboards._rays[direction][square_id]) // squares from square_id to the edge of the board, not including square_id
+#define squares_between(a, b) (Bitboards._between[a][b]) // squares strictly between a and b if they share a rank, file or diagonal, otherwise empty
+#define line_through(a, b) (Bitboards._line[a][b]) // the full rank, file or diagonal through a and b, empty if there is none
+
+struct alignas(64) _Bitboards {
+
+	uint64_t _knight_attacks[64] = {};
+	uint64_t _king_attacks[64] = {};
+	uint64_t _pawn_attacks[2][64] = {}; // [<White>, <Black>]
+	uint64_t _rays[8][64] = {};
+	uint64_t _between[64][64] = {};
+	uint64_t _line[64][64] = {};
+
+	constexpr _Bitboards();
+
+};
+
+// squares attacked along one ray from square_id, including the first piece of occupancy hit
+inline uint64_t ray_attacks(uint8_t square_id, uint64_t occupancy, uint8_t direction) {
+	uint64_t attacks = ray(square_id, direction);
+	uint64_t blockers = attacks & occupancy;
+	if(blockers != 0) {
+		attacks ^= ray(direction < DIR_SOUTH ? lsb(blockers) : msb(blockers), direction);
+	}
+	return attacks;
+}
+
+inline uint64_t bishop_attacks(uint8_t square_id, uint64_t occupancy) {
+	return ray_attacks(square_id, occupancy, DIR_NORTH_EAST) | ray_attacks(square_id, occupancy, DIR_NORTH_WEST) |
+		   ray_attacks(square_id, occupancy, DIR_SOUTH_EAST) | ray_attacks(square_id, occupancy, DIR_SOUTH_WEST);
+}
+
+inline uint64_t rook_attacks(uint8_t square_id, uint64_t occupancy) {
+	return ray_attacks(square_id, occupancy, DIR_NORTH) | ray_attacks(square_id, occupancy, DIR_EAST) |
+		   ray_attacks(square_id, occupancy, DIR_SOUTH) | ray_attacks(square_id, occupancy, DIR_WEST);
+}
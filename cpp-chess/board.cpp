@@ -4,17 +4,16 @@
 #include <vector>
 #include <string>
 #include <map>
-#define _contains(setmap, key) ((setmap).find(key) != (setmap).end())
 
 #include "board.h"
 #include "move.h"
-#include "attack-squares.h"
+#include "bitboard.h"
 #include "zobrist.h"
 #include "chess_containers.h"
 
 using namespace std;
 
-#define STATE_STACK_STARTING_SIZE 128
+#define UNDO_STACK_STARTING_SIZE 256 // enough for most games and any search without growing
 
 const char* square_names[64] = {
 	"a1", "b1", "c1", "d1", "e1", "f1", "g1", "h1", 
@@ -68,12 +67,11 @@ bool BoardState::operator==(const BoardState& other) const {
 ///////////// Board Methods
 //////////////////////////////////////////////////
 
-Board::Board(const char* fen) {
+Board::Board(const char* fen) : current() {
 
-	// initialize stateStack vector
-	stateStack.reserve(STATE_STACK_STARTING_SIZE);
-	stateStack.emplace_back();
-	state = stateStack.data();
+	// initialize the undo stack
+	undoStack.reserve(UNDO_STACK_STARTING_SIZE);
+	state = &current;
 
 	char* pos = (char*) fen;
 	size_t idx;
@@ -167,8 +165,9 @@ Board::Board(const char* fen) {
 		// determine if enpass is actually possible and set possible bit
 		uint64_t enpass_capture_color = rank(enpass_square) == 2 ? WHITE : BLACK; // color of the pawn possibly threatened to be captured by enpassant
 		assert(state->turn == other_color(enpass_capture_color)); // The piece being threatend by enpassant should always be the color whose turn it is not
-		vector<uint8_t> capture_squares = pawn_attack_squares(enpass_square, enpass_capture_color); // get possible squares pawns can capture from
-		for(uint8_t sq : capture_squares) {
+		uint64_t capture_squares = pawn_attacks(enpass_square, enpass_capture_color); // get possible squares pawns can capture from
+		uint8_t sq;
+		for_each_square(sq, capture_squares) {
 			if(state->squares[sq] == (other_color(enpass_capture_color) | PAWN) ) { // there is an enpass move available
 				enpass_square |= ENPASS_AVAIL_MASK;
 				break;
@@ -195,6 +194,9 @@ Board::Board(const char* fen) {
 	// Generate Zobstist hash and store it - this should be the only place this needs to be sone from scratch (for non-debug purposes anyways)
 	state->zobrist = genZobrist();
 
+	// Generate the bitboards from the squares
+	genBitboards();
+
 	// Generate the initial composition
 	state->composition = Composition(*state);
 
@@ -209,12 +211,11 @@ Board::Board(const char* fen) {
 }
 
 // Initializes board to starting position
-Board::Board() {
+Board::Board() : current() {
 	
-	// initialize stateStack vector
-	stateStack.reserve(STATE_STACK_STARTING_SIZE);
-	stateStack.emplace_back();
-	state = stateStack.data();
+	// initialize the undo stack
+	undoStack.reserve(UNDO_STACK_STARTING_SIZE);
+	state = &current;
 
 	// place the pieces
 	state->squares[0] = WHITE | ROOK;
@@ -258,6 +259,9 @@ Board::Board() {
 	// initialize zobrist hash
 	state->zobrist = starting_hash;
 
+	// initialize the bitboards
+	genBitboards();
+
 	// initialize the composition
 	state->composition = Composition();
 
@@ -267,11 +271,10 @@ Board::Board() {
 }
 
 // Initializes board from state
-Board::Board(BoardState s) {
+Board::Board(BoardState s) : current(s) {
 	
-	stateStack.reserve(STATE_STACK_STARTING_SIZE);
-	stateStack.push_back(s);
-	state = stateStack.data();
+	undoStack.reserve(UNDO_STACK_STARTING_SIZE);
+	state = &current;
 
 }
 
@@ -318,319 +321,260 @@ static void print_vector(vector<Move> v) {
 	printf("]\n");
 }
 
-void Board::checksAndPins(SquareSet& check_path, bool& check, bool& double_check,
-			map<uint8_t, SquareSet >& pinned_squares) {
-
-	uint8_t king = king_pos(state->turn);
-
-	// check for knight checks
-	vector<vector<uint8_t> >* knight_attack_paths = &attack_paths(king, KNIGHT);
-	for(int p = 0; p < knight_attack_paths->size(); p++) {
-		uint8_t sq = (*knight_attack_paths)[p][0];
-		if(state->squares[sq] == (other_color(state->turn) | KNIGHT)) { // Knight check
-			check = true;
-			check_path.insert(sq);
+// builds the bitboards from squares, and the checks and pins that depend on them
+void Board::genBitboards() {
+	for(uint8_t c = 0; c < 2; c++) {
+		for(uint8_t p = 0; p < 6; p++) {
+			state->bitboards[c][p] = 0;
+		}
+		state->occupied[c] = 0;
+	}
+	for(uint8_t sq = 0; sq < 64; sq++) {
+		if(state->squares[sq] != 0) {
+			toggle_piece(sq, state->squares[sq]);
 		}
 	}
+	state->checkers = attackers(king_pos(state->turn), other_color(state->turn), occupied(WHITE) | occupied(BLACK));
+	state->checkers_known = true;
+	state->pins_known = false;
+}
 
-	// check for Bishop / Rook checks
-		/* This uses a weird for loop to run the checking code for bishops/rooks/queens
-			in two passes looking at bishop moves and then rook moves */
+// gives the pieces of color that attack square when the squares in occupancy are the ones occupied
+uint64_t Board::attackers(uint8_t square, uint8_t color, uint64_t occupancy) {
+	return (pawn_attacks(square, other_color(color)) & pieces(color, PAWN)) |
+		   (knight_attacks(square) & pieces(color, KNIGHT)) |
+		   (king_attacks(square) & pieces(color, KING)) |
+		   (bishop_attacks(square, occupancy) & (pieces(color, BISHOP) | pieces(color, QUEEN))) |
+		   (rook_attacks(square, occupancy) & (pieces(color, ROOK) | pieces(color, QUEEN)));
+}
 
-	vector<vector<uint8_t> >* bishop_attack_paths = &attack_paths(king, BISHOP);
-	vector<vector<uint8_t> >* rook_attack_paths = &attack_paths(king, ROOK);
-	
-	// this points to the array currently being iterated
-	vector<vector<uint8_t> >* paths = bishop_attack_paths;
-	uint8_t checking_piece = BISHOP;
-
-	for(uint8_t c = 0; c < 2; c++, paths = rook_attack_paths, checking_piece = ROOK) { // it was this or gotos - I aint making a method
-		for(int p = 0; p < (*paths).size(); p++) {
-			uint8_t blocked = 255;
-			for(int s = 0; s < (*paths)[p].size(); s++) {
-				uint8_t sq = (*paths)[p][s];
-				if(state->squares[sq] != 0) {
-					if(state->squares[sq] == (other_color(state->turn) | checking_piece) || 
-							state->squares[sq] == (other_color(state->turn) | QUEEN)) { // Bishop/queen check or pin
-						if(blocked < 64) { // discovered a pin
-							SquareSet pinned_set;
-							for(int i = 0; i <= s; i++) {
-								pinned_set.insert((*paths)[p][i]);
-							}
-							pinned_squares.insert(pair<uint8_t, SquareSet >(blocked, pinned_set));
-						} else if(!check){ // discovered first check
-							check = true;
-							for(int i = 0; i <= s; i++) {
-								check_path.insert((*paths)[p][i]);
-							}
-						} else { // discovered second check
-							double_check = true;
-						}
-						break;
-					} else if(color(state->squares[sq]) == state->turn) { // potential pin
-						if(blocked < 64) { // double block = no pin
-							break;
-						} else { // potential pin
-							blocked = sq;
-						}
-					} else { // enemy piece not delivering check
-						break;
-					}
-				}
-			}
-		}
+/*
+	Sets state->checkers once move has been made (state->turn is the side to move after it)
+	After a normal move only the moved piece can give check directly, and only a slider behind from_square on
+	a line with the king can give a discovered check, so those are all that is looked at. Castles, en passant
+	and promotions move or remove more than one piece and are rare enough to look at every piece.
+*/
+void Board::updateCheckers(Move move) {
+	uint8_t king = king_pos(state->turn);
+	uint8_t mover = other_color(state->turn);
+	uint64_t occupancy = occupied(WHITE) | occupied(BLACK);
+	if(move.move_type != MOVE_NORMAL) {
+		state->checkers = attackers(king, mover, occupancy);
+		state->checkers_known = true;
+		return;
 	}
 
-	// check for pawn checks
-	vector<uint8_t>* pawn_attack_squares = &pawn_attack_squares(king, state->turn);
-	for(uint8_t s = 0; s < pawn_attack_squares->size(); s++) {
-		uint8_t sq = (*pawn_attack_squares)[s];
-		if(state->squares[sq] == (other_color(state->turn) | PAWN)) { // discovered pawn check
-			if(!check) { // first check discovered
-				check = true;
-				check_path.insert(sq);
-			} else { // second check
-				double_check = true;
-			}
-		}
+	uint64_t attacked = 0; // squares the moved piece attacks
+	uint8_t to = move.to_square;
+	switch(piece(state->squares[to])) {
+		case PAWN   : attacked = pawn_attacks(to, mover); break;
+		case KNIGHT : attacked = knight_attacks(to); break;
+		case BISHOP : attacked = bishop_attacks(to, occupancy); break;
+		case ROOK   : attacked = rook_attacks(to, occupancy); break;
+		case QUEEN  : attacked = bishop_attacks(to, occupancy) | rook_attacks(to, occupancy); break;
+		case KING   : break; // a king never gives check
 	}
+	state->checkers = (attacked & bit(king)) != 0 ? bit(to) : 0;
 
-	// ------------------------ 
-	// printf("---\n");
-	// printf("check : %s\n", check ? "true" : "false");
-	// printf("double_check : %s\n", double_check ? "true" : "false");
-	// printf("pinned_squares:\n");
-	// print_vector(pinned_squares);
-	// printf("pinned_sets:\n");
-	// print_vector(pinned_sets);
-	// printf("check_path:\n");
-	// print_vector(check_path);
+	uint64_t line = line_through(king, move.from_square);
+	if(line != 0) { // from_square is on a line with the king - look for a discovered check along it
+		if(rank(king) == rank(move.from_square) || file(king) == file(move.from_square)) {
+			state->checkers |= line & rook_attacks(king, occupancy) & (pieces(mover, ROOK) | pieces(mover, QUEEN));
+		} else {
+			state->checkers |= line & bishop_attacks(king, occupancy) & (pieces(mover, BISHOP) | pieces(mover, QUEEN));
+		}
+	}
+	state->checkers_known = true;
 }
 
-
 /*
-	fills in attack_squares with square ids that color can move to psuedolegally
-	Intended for use in determining valid king moves
+	Gives the pieces of the side to move that are pinned to their king - computed the first time it is needed for
+	a position and kept in the state after that
+	An enemy slider on a line with the king pins the piece between them if it is the only piece between them and it
+	is the king's. When no enemy slider shares a line with the king there is nothing to look at.
 */
-void Board::attackSquares(SquareSet& attack_squares, uint8_t color, SquareSet& check_path_end) {
-	for(uint8_t sq = 0; sq < 64; sq++) {
-		if(color(state->squares[sq]) == color) {
-			if(piece(state->squares[sq]) == PAWN) {
-				for(int s = 0; s < pawn_attack_squares(sq, color).size(); s++) {
-					attack_squares.insert(pawn_attack_squares(sq, color)[s]);
-				}
-			} else {
-				vector<vector<uint8_t> >& paths = attack_paths(sq, piece(state->squares[sq]));
-				for(int p = 0; p < paths.size(); p++) {
-					vector<uint8_t>& path = paths[p];
-					for(int s = 0; s < path.size(); s++) {
-						if(state->squares[path[s]] == 0) { // attacking empty square
-							attack_squares.insert(path[s]);
-						} else { // attacking piece
-							attack_squares.insert(path[s]);
-							if(state->squares[path[s]] == (other_color(color) | KING) && s + 1 < path.size()) {
-								check_path_end.insert(path[s+1]);
-							}
-							break;
-						}
-					}
-				}
-			}
+uint64_t Board::pinnedPieces() {
+	if(state->pins_known) {
+		return state->pinned;
+	}
+	uint8_t other = other_color(state->turn);
+	uint8_t king = king_pos(state->turn);
+	uint64_t own = occupied(state->turn);
+	uint64_t occupancy = own | occupied(other);
+	uint64_t snipers = (bishop_attacks(king, 0) & (pieces(other, BISHOP) | pieces(other, QUEEN))) |
+					   (rook_attacks(king, 0) & (pieces(other, ROOK) | pieces(other, QUEEN)));
+	uint64_t pinned = 0;
+	uint8_t sq;
+	for_each_square(sq, snipers) {
+		uint64_t blockers = squares_between(king, sq) & occupancy;
+		if(popcount(blockers) == 1 && (blockers & own) != 0) {
+			pinned |= blockers;
 		}
 	}
+	state->pinned = pinned;
+	state->pins_known = true;
+	return pinned;
 }
 
-MoveGenerator Board::legalMoves() {
+/*
+	Generates the legal moves into moves - when moves is NULL it stops at the first legal move found, which
+	is all that's needed to know if the game has ended
+	state->game_end_reason is set if the game has ended
+	returns true if there is a legal move
+*/
+bool Board::generateMoves(MoveList* moves) {
 	
 	// Check for insufficient material, three move repetition, and 50 move rule
 	if(isDrawRepitition()) {
 		state->game_end_reason = REPITION;
-		co_return;
+		return false;
 	} else if(isDrawInsuficientMaterial()) {
 		state->game_end_reason = INSUFICIENT_MATERIAL;
-		co_return;
+		return false;
 	}
 
-	SquareSet check_path; // only look at if check == True && double_check == False // lists squares which a piece may move to or capture on to stop check
-	SquareSet check_path_end; // square_ids of squares covered by check bechind king - 255 if NA
-	bool check = false; // true if the king is in check
-	bool double_check = false; // true if the king is in check and is threatened by two pieces from different directions
-	map<uint8_t, SquareSet > pinned_squares; // key = square of pinned piece, value = squares it is pinned to
-	SquareSet attack_squares; // set of all squares the other color may psuedolegally move to
+	uint8_t turn = state->turn;
+	uint8_t other = other_color(turn);
+	uint8_t king = king_pos(turn);
+	uint64_t own = occupied(turn);
+	uint64_t enemy = occupied(other);
+	uint64_t occupancy = own | enemy;
+	if(!state->checkers_known) { // the position was gone back to by unmakeMove
+		state->checkers = attackers(king, other, occupancy);
+		state->checkers_known = true;
+	}
+	uint64_t checkers = state->checkers; // pieces giving check
+	bool check = checkers != 0; // true if the king is in check
 	bool move_found = false;
+	uint8_t sq, tsq;
 
-	// build all the check info
-	checksAndPins(check_path, check, double_check, pinned_squares);
-	// build attack_squares
-	attackSquares(attack_squares, other_color(state->turn), check_path_end);
+	/*
+		Adds a legal move, or returns on the first one when only looking for whether there is one
+		(once a move is found the game can only have ended by the 50 move rule)
+	*/
+	#define add_move(move) do {                                     \
+		if(moves == NULL) {                                         \
+			if(isDrawFiftyMove()) {                                 \
+				state->game_end_reason = FIFTY_MOVE;                \
+			}                                                       \
+			return true;                                            \
+		}                                                           \
+		moves->push(move);                                          \
+		move_found = true;                                          \
+	} while(0)
+
+	// Adds a pawn move from -> to, or all four promotions if it reaches the last rank
+	#define add_pawn_move(from, to) do {                            \
+		if(rank(to) == 0 || rank(to) == 7) {                        \
+			add_move(Move(from, to, MOVE_PROMOTE, KNIGHT));         \
+			add_move(Move(from, to, MOVE_PROMOTE, BISHOP));         \
+			add_move(Move(from, to, MOVE_PROMOTE, ROOK));           \
+			add_move(Move(from, to, MOVE_PROMOTE, QUEEN));          \
+		} else {                                                    \
+			add_move(Move(from, to));                               \
+		}                                                           \
+	} while(0)
 
 	// Calculate normal (non-castle) king moves first
-	uint8_t king = king_pos(state->turn);
-	for(int p = 0; p < attack_paths(king, KING).size(); p++) {
-		uint8_t sq = attack_paths(king, KING)[p][0];
-		if(color(state->squares[sq]) != state->turn && !attack_squares.contains(sq) && !check_path_end.contains(sq)) { // sq is safe
-			co_yield Move(king, sq);
-			move_found = true;
+	// 	the king is taken off the board so squares behind it on the line of a checking slider count as attacked
+	uint64_t targets = king_attacks(king) & ~own;
+	for_each_square(tsq, targets) {
+		if(attackers(tsq, other, occupancy ^ bit(king)) == 0) { // tsq is safe
+			add_move(Move(king, tsq));
 		}
 	}
 
-	// printf("king is at %s\n", square_name(king));
-	// printf("finished king moves\n");
-	// print_vector(moves);
-
-	if(double_check) { // double_check -> king must move
+	if(popcount(checkers) > 1) { // double check -> king must move
 		if(!move_found) { // no moves + double check = checkmate
-			state->game_end_reason = other_color(state->turn) | CHECKMATE;
+			state->game_end_reason = other | CHECKMATE;
+		} else if(isDrawFiftyMove()) {
+			state->game_end_reason = FIFTY_MOVE;
 		}
-		co_return;
+		return move_found;
 	}
 
 	// Next do castles
-	if(castle_avail(state->turn, CASTLE_KING) && !check &&             // check if the king can castle kingside
-				state->squares[king+1] == 0 && state->squares[king+2] == 0 &&
-				!attack_squares.contains(king+1) &&
-				!attack_squares.contains(king+2)) {
-		co_yield Move(king, king+2, MOVE_CASTLE, CASTLE_KING);
-		move_found = true;
+	if(castle_avail(turn, CASTLE_KING) && !check &&             // check if the king can castle kingside
+				(occupancy & (bit(king+1) | bit(king+2))) == 0 &&
+				attackers(king+1, other, occupancy) == 0 &&
+				attackers(king+2, other, occupancy) == 0) {
+		add_move(Move(king, king+2, MOVE_CASTLE, CASTLE_KING));
 	}
-	if(castle_avail(state->turn, CASTLE_QUEEN) && !check &&            // check if the king can castle queenside
-				state->squares[king-1] == 0 && state->squares[king-2] == 0 && state->squares[king-3] == 0 &&
-				!attack_squares.contains(king-1) &&
-				!attack_squares.contains(king-2)) {
-		co_yield Move(king, king-2, MOVE_CASTLE, CASTLE_QUEEN);
-		move_found = true;
+	if(castle_avail(turn, CASTLE_QUEEN) && !check &&            // check if the king can castle queenside
+				(occupancy & (bit(king-1) | bit(king-2) | bit(king-3))) == 0 &&
+				attackers(king-1, other, occupancy) == 0 &&
+				attackers(king-2, other, occupancy) == 0) {
+		add_move(Move(king, king-2, MOVE_CASTLE, CASTLE_QUEEN));
 	}
 
-	// printf("finished castle moves\n");
-	// print_vector(moves);
-
 	/*
 		All other moves must fulfil the following requirements
-		 - if from_square is in a pinned set, to_square must be in the pinned set
-		 - if check == true, move must be a king move or to_square must be in check_path
+		 - if the king is in check, to_square must be on check_mask (the checking piece or a square between it and the king)
+		 - a pinned piece must stay on the line through the king and itself
 	*/
-	for(int sq = 0; sq < 64; sq++) {
-		if(color(state->squares[sq]) == state->turn && sq != king) { // found piece to look for moves
-
-			bool pinned = _contains(pinned_squares, sq);
-			SquareSet* pinned_set = pinned ? &pinned_squares[sq] : NULL;
-
-			if(piece(state->squares[sq]) == PAWN) { // piece is a pawn
-				// look at attacks first (captures + en-passant)
-				vector<uint8_t>& attacks = pawn_attack_squares(sq, state->turn);
-				for(int s = 0; s < attacks.size(); s++) { // iterate over attack squares
-					uint8_t asq = attacks[s];
-					uint8_t csq = enpass_capture_square(asq);
-					if(state->enpass_info != NO_ENPASS &&
-								(asq == enpass_square(state->enpass_info)) &&
-								(state->squares[csq] == (other_color(state->turn) | PAWN)) &&
-								(!pinned || pinned_set->contains(asq)) &&
-								(!check || check_path.contains(csq))) { // potential enpassant
-						/* 
-							The if statement qualifies that the movement of the capturing pawn is legal, but
-							Need to check that removing the captured pawn doesnt put king in check
-							This is done by looking for rook/bishops/queens in line with the king and removed pawn
-							Technically, no legal position can have a revealed bishop check from enpassant, but i'll
-							still check anyways since this can come up in artificial positions
-							revealed rook checks can only possible arrise horizontally
-						*/
-						int8_t df = file(csq) - file(king),
-							dr = rank(csq) - rank(king);
-						uint8_t pinning_piece;
-						if(dr == 0) { // look for horizontal pin
-							pinning_piece = ROOK;
-						} else if(df == dr || -df == dr) { // look for revealed diagonal pin
-							pinning_piece = BISHOP;
-						} else { // no possible pin
-							co_yield Move(sq, asq, MOVE_ENPASS, csq);
-							move_found = true;
-							continue;
-						}
-						df = (df > 0) - (df < 0); // get signs of dr and df (+1 or -1)
-						dr = (dr > 0) - (dr < 0);
-						bool valid = true;
-						for(uint8_t f = file(csq) + df, r = rank(csq) + dr; f >= 0 && f < 8 && r >= 0 && r < 8; f += df, r+= dr) {
-							uint8_t tsq = square_id(r, f);
-							if(tsq != sq) {
-								uint8_t pid = state->squares[tsq];
-								if(pid != 0) {
-									if(pid == (other_color(state->turn) | pinning_piece) || pid == (other_color(state->turn) | QUEEN)) {
-										valid = false; // there is an attacker and pin
-										break;
-									}
-									break;
-								}
-							}
-						}
-						if(!valid) { // check to make sure the pin isnt blocked on the other side
-							for(uint8_t f = file(csq) - df, r = rank(csq) - dr; f >= 0 && f < 8 && r >= 0 && r < 8; f -= df, r-= dr) {
-								uint8_t tsq = square_id(r, f);
-								if(tsq == king) {
-									break;
-								} else if(tsq != sq && state->squares[tsq] != 0) {
-									valid = true;
-								}
-							}
-						}
-						if(valid) {
-							co_yield Move(sq, asq, MOVE_ENPASS, csq);
-							move_found = true;
-						}
-					} else if(color(state->squares[asq]) == other_color(state->turn) && 
-								(!pinned || pinned_set->contains(asq)) &&
-								(!check || check_path.contains(asq))) {     // pawn capture
-						if(rank(asq) == 0 || rank(asq) == 7) {
-							co_yield Move(sq, asq, MOVE_PROMOTE, KNIGHT);
-							co_yield Move(sq, asq, MOVE_PROMOTE, BISHOP);
-							co_yield Move(sq, asq, MOVE_PROMOTE, ROOK);
-							co_yield Move(sq, asq, MOVE_PROMOTE, QUEEN);
-						} else {
-							co_yield Move(sq, asq);
-						}
-						move_found = true;
-					}
+	uint64_t check_mask = check ? (squares_between(king, lsb(checkers)) | checkers) : ~(uint64_t) 0;
+	uint64_t pinned = pinnedPieces();
+
+	int8_t forward = turn == WHITE ? 8 : -8;
+	uint8_t start_rank = turn == WHITE ? 1 : 6;
+	uint64_t others = own ^ bit(king);
+	for_each_square(sq, others) { // found piece to look for moves
+		uint64_t allowed = check_mask;
+		if((pinned & bit(sq)) != 0) {
+			allowed &= line_through(king, sq);
+		}
+
+		uint8_t pid = state->squares[sq];
+		if(piece(pid) == PAWN) { // piece is a pawn
+			// look at attacks first (captures + en-passant)
+			targets = pawn_attacks(sq, turn) & enemy & allowed;
+			for_each_square(tsq, targets) {
+				add_pawn_move(sq, tsq);
+			}
+			if(enpass_avail(state->enpass_info) && (pawn_attacks(sq, turn) & bit(enpass_square(state->enpass_info))) != 0) {
+				uint8_t asq = enpass_square(state->enpass_info);
+				uint8_t csq = enpass_capture_square(asq);
+				/* 
+					Rather than checking pins and check paths, make sure the king isn't attacked once both pawns
+					have moved. This also covers the rook/queen revealed by removing two pawns from the king's rank,
+					which no pin can describe, and capturing a pawn that is giving check.
+				*/
+				uint64_t after = (occupancy ^ bit(sq) ^ bit(csq)) | bit(asq);
+				if((pieces(other, PAWN) & bit(csq)) != 0 &&
+							(bishop_attacks(king, after) & (pieces(other, BISHOP) | pieces(other, QUEEN))) == 0 &&
+							(rook_attacks(king, after) & (pieces(other, ROOK) | pieces(other, QUEEN))) == 0 &&
+							(knight_attacks(king) & pieces(other, KNIGHT)) == 0 &&
+							(pawn_attacks(king, turn) & pieces(other, PAWN) & ~bit(csq)) == 0) {
+					add_move(Move(sq, asq, MOVE_ENPASS, csq));
 				}
-				// Time to look at pawn pushes
-				vector<uint8_t>& path = pawn_move_path(sq, state->turn);
-				for(int s = 0; s < path.size(); s++) { // iterate over push squares
-					uint8_t tsq = path[s];
-					if(state->squares[tsq] != 0) { // There is a piece blocking the path
-						break;
-					}
-					if((!pinned || pinned_set->contains(tsq)) && (!check || check_path.contains(tsq))) {
-						if(rank(tsq) == 0 || rank(tsq) == 7) {
-							co_yield Move(sq, tsq, MOVE_PROMOTE, KNIGHT);
-							co_yield Move(sq, tsq, MOVE_PROMOTE, BISHOP);
-							co_yield Move(sq, tsq, MOVE_PROMOTE, ROOK);
-							co_yield Move(sq, tsq, MOVE_PROMOTE, QUEEN);
-						} else {
-							co_yield Move(sq, tsq);
-						}
-						move_found = true;
-					}
+			}
+			// Time to look at pawn pushes
+			tsq = sq + forward;
+			if((occupancy & bit(tsq)) == 0) {
+				if((allowed & bit(tsq)) != 0) {
+					add_pawn_move(sq, tsq);
 				}
-			} 
-			else { // piece is Knight, Bishop, Rook or Queen
-				vector<vector<uint8_t> >& paths = attack_paths(sq, piece(state->squares[sq]));
-				for(int p = 0; p < paths.size(); p++) { // iterate over all paths the piece can take
-					vector<uint8_t>& path = paths[p];
-					for(int s = 0; s < path.size(); s++) { // iterate over the squares in a single path
-						uint8_t tsq = path[s];
-						if(color(state->squares[tsq]) == state->turn) { // path blocked by same color piece
-							break;
-						}
-						if((!pinned || pinned_set->contains(tsq)) && (!check || check_path.contains(tsq))) { // check for pins and check
-							co_yield Move(sq, tsq);
-							move_found = true;
-						}
-						if(state->squares[tsq] != 0) { // move was capture (ie. blocked by other color piece)
-							break;
-						}
-					}
+				tsq += forward;
+				if(rank(sq) == start_rank && (occupancy & bit(tsq)) == 0 && (allowed & bit(tsq)) != 0) {
+					add_move(Move(sq, tsq));
 				}
 			}
+		} else { // piece is Knight, Bishop, Rook or Queen
+			switch(piece(pid)) {
+				case KNIGHT : targets = knight_attacks(sq); break;
+				case BISHOP : targets = bishop_attacks(sq, occupancy); break;
+				case ROOK   : targets = rook_attacks(sq, occupancy); break;
+				case QUEEN  : targets = bishop_attacks(sq, occupancy) | rook_attacks(sq, occupancy); break;
+				default : assert(false);
+			}
+			targets &= ~own & allowed;
+			for_each_square(tsq, targets) {
+				add_move(Move(sq, tsq));
+			}
 		}
 	}
+	#undef add_pawn_move
+	#undef add_move
 
 	/*
 		Check for game end scenarios
@@ -639,52 +583,57 @@ MoveGenerator Board::legalMoves() {
 	*/
 	if(!move_found) { // no moves = game over
 		if(check) {
-			state->game_end_reason = other_color(state->turn) | CHECKMATE;
+			state->game_end_reason = other | CHECKMATE;
 		} else {
 			state->game_end_reason = STALEMATE;
 		}
 	}  else if(isDrawFiftyMove()) {
 		state->game_end_reason = FIFTY_MOVE;
-		co_return;
 	}
 
-	// print_vector(moves);
-	co_return;
+	return move_found;
+}
+
+void Board::legalMoves(MoveList& moves) {
+	moves.count = 0;
+	generateMoves(&moves);
 }
 
 
 /*
-	legal_moves will do all the same work as this function in addition to returning the legal moves.
+	legalMoves will do all the same work as this function in addition to returning the legal moves.
 	This function is meant for the instances where it needs to be known if the game has ended, but 
-	the possible moves do not matter if the game has not ended.
+	the possible moves do not matter if the game has not ended - move generation stops at the first
+	legal move found.
 
-	Calling both legal_moves and setGameEndReason is inneficient
+	Calling both legalMoves and gameEnd is inneficient
+	returns true if the game has ended
 */
-void Board::setGameEndReason() {
-
-	// execute legalMoves until a move is found, or until completion
-	// legal moves will set endreason if needed, otherwise will quit
-	// upon discovering a move since if there is a move available the
-	// game is not over
-	legalMoves().is_empty();
+bool Board::gameEnd() {
+	generateMoves(NULL);
+	return game_end(state->game_end_reason);
+}
 
+void Board::setGameEndReason() {
+	gameEnd();
 }
 
 bool Board::isDrawRepitition() {
 
-	uint64_t top_zobrist = stateStack[stateStack.size() - 1].zobrist;
+	// undoStack[idx] holds the hash and clock of the position before move idx
+	uint64_t top_zobrist = state->zobrist;
 	int zobrist_repeat_num = 0;
 	int zobrist_repeat_idxs[2] = {-1, -1};
 
 	int prev_clock = state->clock;
-	int idx = stateStack.size() - 3;
+	int idx = undoStack.size() - 2;
 
 	for(; idx >= 0; idx -= 2) { // go backwards on positions with the same player to move
-		if(stateStack[idx].clock != prev_clock - 2) {
+		if(undoStack[idx].clock != prev_clock - 2) {
 			// encountered irreversable move
 			return false;
 		}
-		if(top_zobrist == stateStack[idx].zobrist) {
+		if(top_zobrist == undoStack[idx].zobrist) {
 			// found a potentially repeated position
 			zobrist_repeat_idxs[zobrist_repeat_num] = idx;
 			zobrist_repeat_num++;
@@ -699,22 +648,22 @@ bool Board::isDrawRepitition() {
 		return false;
 	}
 	// check if positions with same zobrist hash are actually the same and not just a hash conflict
-	if(*state == stateStack[zobrist_repeat_idxs[0]] && *state == stateStack[zobrist_repeat_idxs[1]]) {
-		// Found three repeated positions in stateStack
+	if(*state == stateBefore(zobrist_repeat_idxs[0]) && *state == stateBefore(zobrist_repeat_idxs[1])) {
+		// Found three repeated positions in the game
 		return true;
 	} else {
-		// The repeated zobrist hashes in stateStack are due to a hash conflict rather than actual repeated positions
+		// The repeated zobrist hashes in undoStack are due to a hash conflict rather than actual repeated positions
 		// This should be a very rare case, so slow code is okay here - just needs to be correct
 		printf("WARNING: Found zobrist hash conflict predicting false positive for 3 move repetition draw\n"); // print so if this shows up it can be made into a test case
 		int repeat_num = 0;
 		prev_clock = state->clock;
 
-		for(idx = stateStack.size() - 3; idx >= 0; idx -= 2) { // go backwards on positions with the same player to move
-			if(stateStack[idx].clock != prev_clock - 2) {
+		for(idx = undoStack.size() - 2; idx >= 0; idx -= 2) { // go backwards on positions with the same player to move
+			if(undoStack[idx].clock != prev_clock - 2) {
 				// encountered irreversable move
 				return false;
 			}
-			if(*state == stateStack[idx]) {
+			if(*state == stateBefore(idx)) {
 				// found a repeated position
 				repeat_num++;
 				if(repeat_num >= 2) {
@@ -728,6 +677,19 @@ bool Board::isDrawRepitition() {
 
 }
 
+/*
+	Gives the state of the board before move idx of undoStack was made
+	Only the hash and clock of earlier positions are kept, so this takes back the moves on a copy of the state,
+	reading the undo records in place - only needed to tell repeated positions from zobrist hash conflicts
+*/
+BoardState Board::stateBefore(int idx) {
+	Board past(*state);
+	for(int i = undoStack.size() - 1; i >= idx; i--) {
+		past.undoMove(undoStack[i]);
+	}
+	return *past.state;
+}
+
 // if the state is a checkmate state, the checkmate takes precedence over the fifty move rule - should be handled elsewhere
 bool Board::isDrawFiftyMove() {
 	return state->clock >= 100;
@@ -740,9 +702,11 @@ bool Board::isDrawInsuficientMaterial() {
 // precondition: move must be a valid move - undefined behavior if not
 void Board::makeMove(Move move) {
 
-	// Copy existing board state to top of stack and update state pointer
-	stateStack.push_back(*state);
-	state = &stateStack.back();
+	// If move was passed in externally or built from uci, do the extra work of determining the type of move
+	// TODO : This is can possibly be removed by doing this check before passing into makeMove, but for probably extremely little performance benefit
+	if(move.move_type == MOVE_NO_CONTEXT) {
+		move.build_context(*this);
+	}
 
 	// set variables for special moves (enpassant, castling right changes, and promotion)
 	uint8_t from_pid = state->squares[move.from_square];
@@ -751,11 +715,15 @@ void Board::makeMove(Move move) {
 	uint8_t new_enpass_info = NO_ENPASS;
 	uint8_t new_clock = state->clock + 1;
 
-	// If move was passed in externally or built from uci, do the extra work of determining the type of move
-	// TODO : This is can possibly be removed by doing this check before passing into makeMove, but for probably extremely little performance benefit
-	if(move.move_type == MOVE_NO_CONTEXT) {
-		move.build_context(*this);
-	}
+	// Record what unmakeMove needs before anything changes
+	UndoInfo& undo = undoStack.emplace_back();
+	undo.move = move;
+	undo.captured = move.move_type == MOVE_ENPASS ? state->squares[move.enpass_capture_square] : to_pid; // to_pid is 0 for castles
+	*((uint32_t*) undo.castling_avail) = *((uint32_t*) state->castling_avail);
+	undo.enpass_info = state->enpass_info;
+	undo.clock = state->clock;
+	undo.game_end_reason = state->game_end_reason;
+	undo.zobrist = state->zobrist;
 
 	if(move.move_type == MOVE_NORMAL) {
 		// if king - update king position
@@ -801,6 +769,7 @@ void Board::makeMove(Move move) {
 		// move/capture pieces
 		move_piece_no_capture(move);
 		state->zobrist ^= zobrist_piece_at(move.enpass_capture_square, state->squares[move.enpass_capture_square]);
+		toggle_piece(move.enpass_capture_square, state->squares[move.enpass_capture_square]);
 		state->composition.remove(state->squares[move.enpass_capture_square], NULL_SQUARE);
 		state->squares[move.enpass_capture_square] = 0;
 
@@ -822,10 +791,14 @@ void Board::makeMove(Move move) {
 			state->squares[move.to_square + 1] = 0;
 			state->squares[move.to_square - 1] = rook_pid;
 			state->zobrist ^= zobrist_piece_at(move.to_square + 1, rook_pid) ^ zobrist_piece_at(move.to_square - 1, rook_pid);
+			toggle_piece(move.to_square + 1, rook_pid);
+			toggle_piece(move.to_square - 1, rook_pid);
 		} else if(move.castle_direction == CASTLE_QUEEN) { // queenside
 			state->squares[move.to_square - 2] = 0;
 			state->squares[move.to_square + 1] = rook_pid;
 			state->zobrist ^= zobrist_piece_at(move.to_square - 2, rook_pid) ^ zobrist_piece_at(move.to_square + 1, rook_pid);
+			toggle_piece(move.to_square - 2, rook_pid);
+			toggle_piece(move.to_square + 1, rook_pid);
 		} else {
 			assert(false);
 		}
@@ -841,10 +814,13 @@ void Board::makeMove(Move move) {
 		uint8_t new_pid = state->turn | move.promotion_type;
 		if(state->squares[move.to_square] != 0) { // update zobrist and composition if promotion is a capture
 			state->zobrist ^= zobrist_piece_at(move.to_square, state->squares[move.to_square]);
+			toggle_piece(move.to_square, to_pid);
 			state->composition.remove(to_pid, square_color(move.to_square));
 		}
 		state->zobrist ^= zobrist_piece_at(move.from_square, state->squares[move.from_square])
 					   ^  zobrist_piece_at(move.to_square, new_pid);
+		toggle_piece(move.from_square, from_pid);
+		toggle_piece(move.to_square, new_pid);
 		state->composition.remove(from_pid, NULL_SQUARE); // Remove pawn from composition
 		state->composition.add(new_pid, square_color(move.to_square)); // Add promoted piece to composition
 		state->squares[move.to_square] = new_pid;
@@ -871,11 +847,93 @@ void Board::makeMove(Move move) {
 	state->clock = new_clock;
 	state->halfmoves++;
 
+	// Update the checks and pins of the side to move now
+	updateCheckers(move);
+	state->pins_known = false;
+
 }
 
+// Takes back the last move made
 void Board::unmakeMove() {
-	stateStack.pop_back();
-	state = &stateStack.back();
+	undoMove(undoStack.back());
+	undoStack.pop_back();
+}
+
+/*
+	Takes back the move undo was recorded for - it must be the last move played on the state
+	The pieces are moved back on squares, the bitboards and the composition, and the rest of the state comes from
+	the undo record. undoStack is left as it is.
+*/
+void Board::undoMove(const UndoInfo& undo) {
+
+	Move move = undo.move;
+	state->turn = other_color(state->turn); // the side that made the move
+
+	if(move.move_type == MOVE_NORMAL) {
+		uint8_t pid = state->squares[move.to_square];
+		toggle_piece(move.to_square, pid);
+		toggle_piece(move.from_square, pid);
+		state->squares[move.from_square] = pid;
+		state->squares[move.to_square] = undo.captured;
+		if(undo.captured != 0) {
+			toggle_piece(move.to_square, undo.captured);
+			state->composition.add(undo.captured, square_color(move.to_square));
+		}
+		if(piece(pid) == KING) {
+			king_pos(state->turn) = move.from_square;
+		}
+
+	} else if(move.move_type == MOVE_ENPASS) {
+		uint8_t pid = state->squares[move.to_square];
+		toggle_piece(move.to_square, pid);
+		toggle_piece(move.from_square, pid);
+		state->squares[move.from_square] = pid;
+		state->squares[move.to_square] = 0;
+		state->squares[move.enpass_capture_square] = undo.captured;
+		toggle_piece(move.enpass_capture_square, undo.captured);
+		state->composition.add(undo.captured, NULL_SQUARE);
+
+	} else if(move.move_type == MOVE_CASTLE) {
+		uint8_t king_pid = state->turn | KING;
+		uint8_t rook_pid = state->turn | ROOK;
+		uint8_t rook_from = move.castle_direction == CASTLE_KING ? move.to_square + 1 : move.to_square - 2;
+		uint8_t rook_to = move.castle_direction == CASTLE_KING ? move.to_square - 1 : move.to_square + 1;
+		toggle_piece(move.to_square, king_pid);
+		toggle_piece(move.from_square, king_pid);
+		toggle_piece(rook_to, rook_pid);
+		toggle_piece(rook_from, rook_pid);
+		state->squares[move.to_square] = 0;
+		state->squares[move.from_square] = king_pid;
+		state->squares[rook_to] = 0;
+		state->squares[rook_from] = rook_pid;
+		king_pos(state->turn) = move.from_square;
+
+	} else if(move.move_type == MOVE_PROMOTE) {
+		uint8_t pawn_pid = state->turn | PAWN;
+		uint8_t new_pid = state->squares[move.to_square];
+		toggle_piece(move.to_square, new_pid);
+		toggle_piece(move.from_square, pawn_pid);
+		state->composition.remove(new_pid, square_color(move.to_square));
+		state->composition.add(pawn_pid, NULL_SQUARE);
+		state->squares[move.from_square] = pawn_pid;
+		state->squares[move.to_square] = undo.captured;
+		if(undo.captured != 0) {
+			toggle_piece(move.to_square, undo.captured);
+			state->composition.add(undo.captured, square_color(move.to_square));
+		}
+
+	} else { // Invalid move_type
+		assert(false);
+	}
+
+	*((uint32_t*) state->castling_avail) = *((uint32_t*) undo.castling_avail);
+	state->enpass_info = undo.enpass_info;
+	state->clock = undo.clock;
+	state->halfmoves--;
+	state->game_end_reason = undo.game_end_reason;
+	state->zobrist = undo.zobrist;
+	state->checkers_known = false; // usually not needed again - the position's moves were generated before the move was made
+	state->pins_known = false;
 }
 
 
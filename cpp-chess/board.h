@@ -66,8 +66,10 @@ const uint8_t AGREEMENT            = 7;
 #define file(square_id) ((square_id) % 8)
 #define square_id(rank, file) ((rank) * 8 + (file))
 #define square_color(square_id) ((((square_id) >> 3) ^ (square_id)) & 1)
+#define bit(square_id) ((uint64_t) 1 << (square_id)) // bitboard of a single square
 #define enpass_avail(enpass_info) (((enpass_info) & ENPASS_AVAIL_MASK) != 0)
 #define enpass_square(enpass_info) ((enpass_info) & 0b00111111)
+#define enpass_capture_square(enpass_square) (rank(enpass_square) == 2 ? (enpass_square) + 8 : (enpass_square) - 8) // square of the pawn captured by moving to enpass_square
 
 #define other_color(color) (24 - (color))
 
@@ -81,6 +83,18 @@ const uint8_t AGREEMENT            = 7;
 // 	is possible for it to become valid.
 #define castle_avail(color, side) state->castling_avail[((color) >> 2) - (side)]
 
+// Gives the bitboard of the pieces of given color and piece type
+#define pieces(color, piece) state->bitboards[((color) >> 3) - 1][piece]
+
+// Gives the bitboard of all pieces of given color
+#define occupied(color) state->occupied[((color) >> 3) - 1]
+
+// Adds p_id to the bitboards at square_id if it isn't there, or removes it if it is
+#define toggle_piece(square_id, p_id) {                       \
+		pieces(color(p_id), piece(p_id)) ^= bit(square_id); \
+		occupied(color(p_id)) ^= bit(square_id);             \
+	}
+
 // Sets the castling availability to false while updating the zobrist hash
 #define disable_castle(color, side) {                        \
 	if(castle_avail((color), (side))) {                          \
@@ -93,9 +107,12 @@ const uint8_t AGREEMENT            = 7;
 #define move_piece_check_capture(move) {                                                        \
 		if(state->squares[move.to_square] != 0) {                                               \
 			state->zobrist ^= zobrist_piece_at((move).to_square, state->squares[(move).to_square]); \
+			toggle_piece((move).to_square, state->squares[(move).to_square]);                    \
 		}                                                                                       \
 		state->zobrist ^= zobrist_piece_at((move).from_square, state->squares[(move).from_square])  \
 					   ^  zobrist_piece_at((move).to_square, state->squares[(move).from_square]);   \
+		toggle_piece((move).from_square, state->squares[(move).from_square]);                     \
+		toggle_piece((move).to_square, state->squares[(move).from_square]);                       \
 		state->squares[(move).to_square] = state->squares[(move).from_square];                      \
 		state->squares[(move).from_square] = 0;                                                   \
 	}
@@ -105,6 +122,8 @@ const uint8_t AGREEMENT            = 7;
 #define move_piece_no_capture(move) {                                                          \
 		state->zobrist ^= zobrist_piece_at((move).from_square, state->squares[(move).from_square]) \
 					   ^  zobrist_piece_at((move).to_square, state->squares[(move).from_square]);  \
+		toggle_piece((move).from_square, state->squares[(move).from_square]);                    \
+		toggle_piece((move).to_square, state->squares[(move).from_square]);                      \
 		state->squares[(move).to_square] = state->squares[(move).from_square];                     \
 		state->squares[(move).from_square] = 0;                                                  \
 	}
@@ -147,14 +166,36 @@ struct BoardState {
 	uint64_t zobrist; // current zobrist hash
 	Composition composition; // current set and counts of pices on the board
 	uint8_t game_end_reason;
+	uint64_t bitboards[2][6]; // squares of each piece kept alongside squares - [<White>, <Black>][<piece type>]
+	uint64_t occupied[2]; // squares of all the pieces of each color - [<White>, <Black>]
+	uint64_t checkers; // pieces giving check to the king of the side to move - kept up to date by makeMove, only valid if checkers_known
+	bool checkers_known; // cleared by unmakeMove - checkers is found again if the position's moves are generated again
+	uint64_t pinned; // pieces of the side to move pinned to their king - only valid if pins_known
+	bool pins_known; // set once pinned is computed for the position (see Board::pinnedPieces)
 
 	bool operator==(const BoardState& other) const; // determine equality in terms of three-fold repitition rule
 };
 
+/*
+	Record pushed by makeMove with what unmakeMove can't work out from the move itself
+	The squares, bitboards and composition are changed in place and put back by playing the move in reverse, and
+	the checkers are worked out again if they are needed. The rest of BoardState that a move changes is restored from here
+*/
+struct UndoInfo {
+	Move move; // the move made - with its context built
+	uint8_t captured; // p_id of the piece captured by the move (the pawn for enpass), 0 if none
+	uint8_t castling_avail[4];
+	uint8_t enpass_info;
+	uint8_t clock;
+	uint8_t game_end_reason;
+	uint64_t zobrist; // hash of the position before the move
+};
+
 struct Board {
 
-	BoardState* state;
-	vector<BoardState> stateStack;
+	BoardState* state; // always &current - kept so the state-> macros work on any board
+	BoardState current; // the position - changed in place by makeMove and unmakeMove
+	vector<UndoInfo> undoStack; // a record for each move made, oldest first
 
 	// Methods
 
@@ -164,13 +205,17 @@ struct Board {
 	Board(BoardState state);
 
 
-	void attackSquares(SquareSet& attack_squares, uint8_t color, SquareSet& check_path_end);
-	void checksAndPins(SquareSet& check_path, bool& check, bool& double_check,
-				map<uint8_t, SquareSet >& pinned_squares);
-	MoveGenerator legalMoves();
+	void genBitboards();
+	uint64_t attackers(uint8_t square, uint8_t color, uint64_t occupancy);
+	void updateCheckers(Move move);
+	uint64_t pinnedPieces();
+	bool generateMoves(MoveList* moves);
+	void legalMoves(MoveList& moves);
+	bool gameEnd();
 	void setGameEndReason();
 
 	bool isDrawRepitition();
+	BoardState stateBefore(int idx);
 	bool isDrawFiftyMove();
 	bool isDrawInsuficientMaterial();
 
@@ -179,6 +224,7 @@ struct Board {
 	void makeMove(Move move);
 
 	void unmakeMove();
+	void undoMove(const UndoInfo& undo);
 
 	string get_fen();
 	uint64_t genZobrist();
@@ -123,9 +123,14 @@ struct TransTable {
 		data[key & hash_mask] = { key, value };
 	}
 
-	// TODO : Appropriately delete data
-	
-	// ~TransTable() { printf("dest data = %p\n", data); free(data); } // release memory on deletion
+	// the table owns data - it can be moved (ie. by a vector growing) but not copied
+	TransTable(TransTable&& other) noexcept : capacity(other.capacity), data(other.data), hash_mask(other.hash_mask) {
+		other.data = NULL;
+	}
+	TransTable(const TransTable&) = delete;
+	TransTable& operator=(const TransTable&) = delete;
+
+	~TransTable() { free(data); } // release memory on deletion
 
 };
 
@@ -3,19 +3,69 @@
 #include <cstdlib>
 #include <cstring>
 #include <string>
+#include <algorithm>
+#include <mutex>
 
 #include "board.h"
 #include "move.h"
+#include "minimax.h"
 #include "tests/perft-tests.h"
 // #include "zobrist.h"
 
-#define DESCRIPTOR_TABLE_SIZE 100
+/*
+	Boards are referred to by descriptors (bd) - indices into boardDescriptorTable
+	The table grows as boards are created and free descriptors are kept in a linked list through next_free,
+	so creating and freeing a board are O(1) and there is no limit on the number of boards
 
-Board* boardDescriptorTable[DESCRIPTOR_TABLE_SIZE]; // NULL = not allocated
+	Thread safety - every entry point may be called from several threads at once as long as each thread uses
+	a different board. The table is guarded by descriptorTableLock (it moves when it grows), and is only held
+	to find a board, never while using it. Everything else the boards share (attack tables, zobrist randoms)
+	is constant.
+*/
+struct BoardDescriptor {
+	Board* board; // NULL = not allocated
+	MinimaxMaterial* minimax; // search engine of the board - allocated by its first search
+	int next_free; // next free descriptor when board is NULL, -1 for the end of the list
+};
+
+vector<BoardDescriptor> boardDescriptorTable;
+int firstFreeDescriptor = -1;
+std::mutex descriptorTableLock; // guards boardDescriptorTable and firstFreeDescriptor
 
 #define assert_valid_bd(bd) \
-	assert((bd) >= 0 && (bd) < DESCRIPTOR_TABLE_SIZE); \
-	assert(boardDescriptorTable[(bd)] != NULL)
+	assert((bd) >= 0 && (size_t)(bd) < boardDescriptorTable.size()); \
+	assert(boardDescriptorTable[(bd)].board != NULL)
+
+// returns the descriptor given to board
+int allocate_descriptor(Board* board) {
+	std::lock_guard<std::mutex> lock(descriptorTableLock);
+	int bd = firstFreeDescriptor;
+	if(bd < 0) {
+		bd = boardDescriptorTable.size();
+		boardDescriptorTable.push_back({});
+	} else {
+		firstFreeDescriptor = boardDescriptorTable[bd].next_free;
+	}
+	boardDescriptorTable[bd] = {board, NULL, -1};
+	return bd;
+}
+
+Board* get_board(int bd) {
+	std::lock_guard<std::mutex> lock(descriptorTableLock);
+	assert_valid_bd(bd);
+	return boardDescriptorTable[bd].board;
+}
+
+// returns the search engine of a board, allocating it on first use
+MinimaxMaterial* get_minimax(int bd) {
+	std::lock_guard<std::mutex> lock(descriptorTableLock);
+	assert_valid_bd(bd);
+	BoardDescriptor& descriptor = boardDescriptorTable[bd];
+	if(descriptor.minimax == NULL) {
+		descriptor.minimax = new MinimaxMaterial();
+	}
+	return descriptor.minimax;
+}
 
 extern "C" int test_func() {
 	// printf("got string \"%s\"\n", str);
@@ -27,57 +77,114 @@ extern "C" void test_func2(int a) {
 }
 
 extern "C" int create_board() {
-	for(int i = 0; i < DESCRIPTOR_TABLE_SIZE; i++) {
-		if(boardDescriptorTable[i] == NULL) {
-			boardDescriptorTable[i] = new Board();
-			return i;
-		}
-	}
-	return -1; // No free boards
+	return allocate_descriptor(new Board());
 }
 
 extern "C" int create_board_from_fen(const char* fen) {
-	for(int i = 0; i < DESCRIPTOR_TABLE_SIZE; i++) {
-		if(boardDescriptorTable[i] == NULL) {
-			boardDescriptorTable[i] = new Board(fen);
-			return i;
-		}
-	}
-	return -1; // No free boards
+	return allocate_descriptor(new Board(fen));
 }
 
 extern "C" void free_board(int bd) {
-	assert_valid_bd(bd);
-	delete boardDescriptorTable[bd];
-	boardDescriptorTable[bd] = NULL;
+	BoardDescriptor descriptor;
+	{
+		std::lock_guard<std::mutex> lock(descriptorTableLock);
+		assert_valid_bd(bd);
+		descriptor = boardDescriptorTable[bd];
+		boardDescriptorTable[bd] = {NULL, NULL, firstFreeDescriptor};
+		firstFreeDescriptor = bd;
+	}
+	delete descriptor.board;
+	delete descriptor.minimax;
 }
 
 extern "C" void make_move(int bd, const char* uci_move) {
-	assert_valid_bd(bd);
 	assert(uci_move != NULL);
-	Board* board = boardDescriptorTable[bd];
+	Board* board = get_board(bd);
 	Move move(std::string(uci_move), *board);
 	board->makeMove(move);
 }
 
 extern "C" void unmake_move(int bd) {
-	assert_valid_bd(bd);
-	boardDescriptorTable[bd]->unmakeMove();
+	get_board(bd)->unmakeMove();
+}
+
+/*
+	Writes the legal moves of the board as packed moves (see Move::pack) into moves
+		returns the number of legal moves - only the first size are written
+*/
+extern "C" int legal_moves(int bd, uint16_t* moves, int size) {
+	MoveList legal;
+	get_board(bd)->legalMoves(legal);
+	for(int i = 0; i < legal.size() && i < size; i++) {
+		moves[i] = legal[i].pack();
+	}
+	return legal.size();
+}
+
+// plays count packed moves in order - moves are not checked to be legal
+extern "C" void make_moves(int bd, const uint16_t* moves, int count) {
+	Board* board = get_board(bd);
+	for(int i = 0; i < count; i++) {
+		board->makeMove(Move::unpack(moves[i], *board));
+	}
+}
+
+// takes back the last count moves
+extern "C" void unmake_moves(int bd, int count) {
+	Board* board = get_board(bd);
+	for(int i = 0; i < count; i++) {
+		board->unmakeMove();
+	}
+}
+
+uint64_t perft(Board& board, uint8_t depth) {
+	if(depth == 0) {
+		return 1;
+	}
+	MoveList moves;
+	board.legalMoves(moves);
+	if(depth == 1) {
+		return moves.size();
+	}
+	uint64_t count = 0;
+	for(Move move : moves) {
+		board.makeMove(move);
+		count += perft(board, depth - 1);
+		board.unmakeMove();
+	}
+	return count;
+}
+
+/*
+	Perft divide - writes each legal move (packed) into moves and the number of positions reached at depth
+	after playing it into counts
+		returns the number of legal moves - only the first size are searched
+*/
+extern "C" int perft_divide(int bd, uint8_t depth, uint16_t* moves, uint64_t* counts, int size) {
+	assert(depth >= 1);
+	Board* board = get_board(bd);
+	MoveList legal;
+	board->legalMoves(legal);
+	for(int i = 0; i < legal.size() && i < size; i++) {
+		moves[i] = legal[i].pack();
+		board->makeMove(legal[i]);
+		counts[i] = perft(*board, depth - 1);
+		board->unmakeMove();
+	}
+	return legal.size();
 }
 
 extern "C" int count_positions(int bd, uint8_t depth) {
 	// assert(false);
-	assert_valid_bd(bd);
-	uint64_t res = countPositionsZobristTransTable(*boardDescriptorTable[bd], depth);
-	// uint64_t res = boardDescriptorTable[bd]->countPositions(depth);
+	uint64_t res = countPositionsZobristTransTable(*get_board(bd), depth);
+	// uint64_t res = get_board(bd)->countPositions(depth);
 	return res;
 }
 
 
 extern "C" char* get_fen(int bd) {
 	// assert(false);
-	assert_valid_bd(bd);
-	std::string fen = boardDescriptorTable[bd]->get_fen();
+	std::string fen = get_board(bd)->get_fen();
 	size_t length = fen.size() + 1;
 	char* buffer = static_cast<char*>(std::malloc(length));
 	if(buffer == NULL) {
@@ -87,6 +194,51 @@ extern "C" char* get_fen(int bd) {
 	return buffer;
 }
 
+/*
+	Result of a search - mirrored by SearchResult in cpp_chess.py
+		score and mate_in are from white's point of view (mate_in > 0 => white mates)
+*/
+struct SearchResult {
+	char best_move[6]; // uci, null terminated
+	int32_t score;
+	int8_t mate_in;
+	uint8_t depth; // depth of the last completed iteration
+	uint8_t pv_length;
+	uint16_t pv[MAX_SEARCH_PLY]; // principal variation as packed moves
+	SearchStats stats;
+};
+
+/*
+	Searches the board for the best move with iterative deepening
+		depth > 0 => searches up to that depth, otherwise as deep as the budgets allow
+		max_time (seconds) and max_nodes are budgets for the search, 0 for none - at least one of depth and the budgets must be set
+	returns 0 or -1 if the game has already ended
+*/
+extern "C" int search(int bd, uint8_t depth, double max_time, uint64_t max_nodes, SearchResult* result) {
+	assert(result != NULL);
+	assert(depth > 0 || max_time > 0 || max_nodes > 0);
+	Board* board = get_board(bd);
+
+	if(board->gameEnd()) {
+		return -1;
+	}
+
+	MinimaxMaterial* minimax = get_minimax(bd);
+	MinimaxMaterial::MinimaxScore_t score = minimax->search(*board, depth > 0 ? std::min<int>(depth, MAX_SEARCH_PLY - 1) : MAX_SEARCH_PLY - 1, max_time, max_nodes);
+
+	*result = {};
+	std::string uci = score.bestMove.uci();
+	std::strncpy(result->best_move, uci.c_str(), sizeof(result->best_move));
+	result->score = score.score;
+	result->mate_in = score.mate_in;
+	result->depth = minimax->stats.depth;
+	result->pv_length = minimax->pv.size();
+	for(size_t i = 0; i < minimax->pv.size(); i++) {
+		result->pv[i] = minimax->pv[i].pack();
+	}
+	result->stats = minimax->stats;
+	return 0;
+}
 
 // If compiling as a standalone library include a stub entry point
 #ifndef TESTING
@@ -1,9 +1,15 @@
 from ctypes import *
 import ctypes.util
 import pathlib
+import weakref
+import os
+from concurrent.futures import ThreadPoolExecutor
 from chess import Move
 
-chess = CDLL(pathlib.Path().absolute() / "bin" / "cpp-chess")
+# the library is found relative to this file so the module can be imported from any directory
+# 	CDLL releases the GIL for the length of every call, and the library may be used from several threads at once
+# 	as long as each thread uses its own Board - so native searches in a ThreadPoolExecutor run in parallel
+chess = CDLL(pathlib.Path(__file__).parent.absolute() / "bin" / "cpp-chess")
 
 libc_name = ctypes.util.find_library("c")
 if libc_name is None:
@@ -11,8 +17,10 @@ if libc_name is None:
 libc = CDLL(libc_name)
 
 # libc free(void* p) => void
-# free = libc.free
-# free.argtypes = [c_void_p]
+# 	argtypes must be set or the pointer is passed as a 32 bit int
+free = libc.free
+free.restype = None
+free.argtypes = [c_void_p]
 
 # create_board() => int
 create_board = chess.create_board
@@ -39,6 +47,36 @@ unmake_move = chess.unmake_move
 unmake_move.res_type = None
 unmake_move.argtypes = [c_int]
 
+MAX_LEGAL_MOVES = 256 # MAX_MOVES in move.h
+
+# legal_moves(int bd, uint16_t* moves, int size) => int
+legal_moves = chess.legal_moves
+legal_moves.restype = c_int
+legal_moves.argtypes = [c_int, POINTER(c_uint16), c_int]
+
+# make_moves(int bd, const uint16_t* moves, int count) => void
+make_moves = chess.make_moves
+make_moves.restype = None
+make_moves.argtypes = [c_int, POINTER(c_uint16), c_int]
+
+# unmake_moves(int bd, int count) => void
+unmake_moves = chess.unmake_moves
+unmake_moves.restype = None
+unmake_moves.argtypes = [c_int, c_int]
+
+# perft_divide(int bd, uint8_t depth, uint16_t* moves, uint64_t* counts, int size) => int
+perft_divide = chess.perft_divide
+perft_divide.restype = c_int
+perft_divide.argtypes = [c_int, c_ubyte, POINTER(c_uint16), POINTER(c_uint64), c_int]
+
+# Moves cross the library packed in 16 bits - <promotion>[14:12] <to_square>[11:6] <from_square>[5:0]
+# 	promotion is a python-chess piece type or 0
+def pack_move(move) :
+	return move.from_square | (move.to_square << 6) | ((move.promotion or 0) << 12)
+
+def unpack_move(packed) :
+	return Move(packed & 63, (packed >> 6) & 63, (packed >> 12) or None)
+
 # countPositions(uint8_t depth) => uint64_t
 count_positions = chess.count_positions
 count_positions.restype = c_ulonglong
@@ -49,16 +87,54 @@ get_fen = chess.get_fen
 get_fen.restype = c_void_p # really returns a c_char_p, but can only be freed if a raw pointer is returned
 get_fen.argtypes = [c_int]
 
+# mirrors struct SearchStats in minimax.h
+class SearchStats(Structure) :
+	_fields_ = [
+		("nodes", c_uint64),
+		("leaf_nodes", c_uint64),
+		("moves_generated", c_uint64),
+		("positions_evaled", c_uint64),
+		("table_lookups", c_uint64),
+		("cutoffs", c_uint64),
+		("depth", c_uint8),
+		("time", c_double),
+	]
+
+MAX_SEARCH_PLY = 64
+
+# mirrors struct SearchResult in cpp-chess.cpp
+class SearchResult(Structure) :
+	_fields_ = [
+		("best_move", c_char * 6),
+		("score", c_int32),
+		("mate_in", c_int8),
+		("depth", c_uint8),
+		("pv_length", c_uint8),
+		("pv", c_uint16 * MAX_SEARCH_PLY),
+		("stats", SearchStats),
+	]
+
+# search(int bd, uint8_t depth, double max_time, uint64_t max_nodes, SearchResult* result) => int
+search = chess.search
+search.restype = c_int
+search.argtypes = [c_int, c_ubyte, c_double, c_uint64, POINTER(SearchResult)]
+
+# A Board must only be used by one thread at a time - different Boards can be used by different threads at once
 class Board() :
 
+	# the native board is freed when the Board is garbage collected, at the end of a with block or by free()
 	def __init__(self, fen=None) :
 		if fen == None :
 			self.bd = create_board()
 		else :
 			self.bd = create_board_from_fen(fen.encode('utf-8'))
-		if self.bd < 0 : # Couldnt make new board
-			print(self.bd)
-			raise MemoryError("Couldn't allocate board")
+		self._finalizer = weakref.finalize(self, free_board, self.bd)
+
+	def __enter__(self) :
+		return self
+
+	def __exit__(self, *exc_info) :
+		self.free()
 	
 	def make_move(self, move) :
 		uci = move.uci().encode('ascii')
@@ -67,9 +143,53 @@ class Board() :
 	def unmake_move(self) :
 		unmake_move(self.bd)
 
+	# legal moves as packed ints - one call into the library however many moves there are
+	def legal_moves_packed(self) :
+		buffer = (c_uint16 * MAX_LEGAL_MOVES)()
+		count = legal_moves(self.bd, buffer, MAX_LEGAL_MOVES)
+		return buffer[:count]
+
+	def legal_moves(self) :
+		return [unpack_move(packed) for packed in self.legal_moves_packed()]
+
+	# plays moves (chess.Move or packed ints) in order with one call
+	def make_moves(self, moves) :
+		packed = [move if isinstance(move, int) else pack_move(move) for move in moves]
+		make_moves(self.bd, (c_uint16 * len(packed))(*packed), len(packed))
+
+	def unmake_moves(self, count) :
+		unmake_moves(self.bd, count)
+
+	# returns {<move>: <number of positions at depth after move>} for every legal move
+	def perft_divide(self, depth) :
+		moves = (c_uint16 * MAX_LEGAL_MOVES)()
+		counts = (c_uint64 * MAX_LEGAL_MOVES)()
+		count = perft_divide(self.bd, depth, moves, counts, MAX_LEGAL_MOVES)
+		return {unpack_move(moves[i]) : counts[i] for i in range(count)}
+
 	def count_positions(self, depth) :
 		return count_positions(self.bd, depth)
 
+	# searches for the best move with iterative deepening up to depth (as deep as it can when 0) within the time (seconds)
+	# and nodes budgets - when a budget runs out the result of the last completed depth is used
+	# 	returns a dict with the best move (chess.Move), score and mate_in from white's point of view (mate_in > 0 => white mates),
+	# 	the depth completed, the principal variation and the search stats - or None if the game has already ended
+	def search(self, depth=0, time=None, nodes=None) :
+		assert depth > 0 or time or nodes, "search needs a depth, time or nodes"
+		result = SearchResult()
+		if search(self.bd, depth, time or 0, nodes or 0, byref(result)) < 0 :
+			return None
+		stats = result.stats
+		return {
+			"best_move": Move.from_uci(result.best_move.decode("ascii")),
+			"score": result.score,
+			"mate_in": result.mate_in,
+			"depth": result.depth,
+			"pv": [unpack_move(result.pv[i]) for i in range(result.pv_length)],
+			"time": stats.time,
+			"stats": {name : getattr(stats, name) for (name, _) in SearchStats._fields_ if name not in ("depth", "time")},
+		}
+
 	def get_fen(self) :
 		_fen = get_fen(self.bd)
 		if not _fen :
@@ -77,13 +197,20 @@ class Board() :
 		try :
 			result = cast(_fen, c_char_p).value.decode("utf-8")
 		finally :
-			libc.free(_fen)
+			free(_fen)
 		return result
 
 
-	def free(self) : 
-		# C++ memory needs to be freed when the board is garbage collected
-		free_board(self.bd)
+	# frees the native board now - it can't be used after, but freeing it again does nothing
+	def free(self) :
+		self._finalizer()
 
-	
-	
+
+def _search_fen(fen, depth, time, nodes) :
+	with Board(fen) as board :
+		return board.search(depth, time, nodes)
+
+# searches every fen in fens with a native search per thread, returning the results of Board.search in order
+def search_positions(fens, depth=0, time=None, nodes=None, workers=None) :
+	with ThreadPoolExecutor(workers or os.cpu_count()) as executor :
+		return list(executor.map(_search_fen, fens, [depth] * len(fens), [time] * len(fens), [nodes] * len(fens)))
@@ -4,6 +4,8 @@
 #include <stdio.h>
 #include <cmath>
 #include <vector>
+#include <algorithm>
+#include <chrono>
 #include <assert.h>
 #include <string.h>
 
@@ -13,6 +15,8 @@
 
 
 #define DEFAULT_TRANS_TABLE_SIZE 0x100000   // 1,048,576
+#define MAX_SEARCH_PLY 64
+#define BUDGET_CHECK_NODES 1024 // nodes searched between checks of the node/time budget (power of 2)
 
 /*
     MinimaxScore represents the intermediate results of the minimax search
@@ -57,6 +61,32 @@ struct MinimaxScore : Score<Eval_t> {
     Move bestMove;
 };
 
+// bounds of the scores stored in the transposition table
+#define BOUND_EXACT 0
+#define BOUND_LOWER 1 // the position's score is at least the one stored
+#define BOUND_UPPER 2 // the position's score is at most the one stored
+
+template <class Eval_t>
+struct TableEntry {
+    Score<Eval_t> score; // mate_in is counted from the position stored rather than the root
+    uint8_t bound;
+    uint16_t bestMove; // packed (see Move::pack), 0 for none
+};
+
+/*
+    Stats of the last search - mirrored by SearchStats in cpp_chess.py
+*/
+struct SearchStats {
+    uint64_t nodes; // positions searched
+    uint64_t leaf_nodes; // positions where the game had ended
+    uint64_t moves_generated;
+    uint64_t positions_evaled;
+    uint64_t table_lookups; // transposition table entries whose score was used
+    uint64_t cutoffs; // alpha-beta cutoffs
+    uint8_t depth; // depth of the last completed iteration
+    double time; // seconds
+};
+
 /*
     Abstract class to be subclassed with specific implementation of eval function
 */
@@ -65,100 +95,202 @@ class Minimax {
 public:
     using Score_t = Score<Eval_t>;
     using MinimaxScore_t = MinimaxScore<Eval_t>;
+    using TableEntry_t = TableEntry<Eval_t>;
 
-    TransTable<Score_t> table;
+    TransTable<TableEntry_t> table;
     uint8_t search_depth;
 
-    // stats
-    uint64_t leaf_nodes;
-    uint64_t moves_generated;
-    uint64_t positions_evaled;
-    uint64_t table_lookups;
+    SearchStats stats;
+    vector<Move> pv; // principal variation of the last completed iteration
 
     Minimax() : table(DEFAULT_TRANS_TABLE_SIZE) {}
     Minimax(size_t capacity) : table(capacity) {}
 
     virtual Eval_t eval(Board& board) = 0;
-    
+
     void setDepth(uint8_t depth) {
         this->search_depth = depth;
     }
 
-    // Implements a depth-limited minimax search with alpha-beta pruning
+    // Searches to search_depth
     MinimaxScore_t search(Board& board) {
+        return search(board, search_depth);
+    }
+
+    /*
+        Iterative deepening alpha-beta search up to max_depth
+            max_time (seconds) and max_nodes are budgets for the whole search, 0 for none - when one runs out the
+            search stops and the result of the last completed depth is returned
+    */
+    MinimaxScore_t search(Board& board, uint8_t max_depth, double max_time = 0, uint64_t max_nodes = 0) {
 
         assert(game_end(board.state->game_end_reason) == false); // Cannot search on a leaf node
+        assert(max_depth > 0 && max_depth < MAX_SEARCH_PLY);
 
-        leaf_nodes = 0;
-        moves_generated = 0;
-        positions_evaled = 0;
-        table_lookups = 0;
+        start = std::chrono::steady_clock::now();
+        time_limit = max_time;
+        node_limit = max_nodes;
+        aborted = false;
+        stats = {};
+        pv.clear();
+        board.undoStack.reserve(board.undoStack.size() + MAX_SEARCH_PLY); // so makeMove never grows the undo stack mid-search
 
-        /*
-            Do a first level search
-        */
-        Score_t score = _search(board, search_depth);
-        bool maxing = board.state->turn == WHITE;
-        Score_t bestScore;
-        Move bestMove;
-        MoveGenerator moves = board.legalMoves();
-        bool firstIteration = true;
-        for(Move move : moves) {
-            moves_generated++;
-            board.makeMove(move);
-            Score_t score = _search(board, search_depth - 1);
-            if(firstIteration) {
-                bestScore = score;
-                bestMove = move;
-                firstIteration = false;
-            } else if((maxing && score > bestScore) || (!maxing && score < bestScore)) {
-                bestScore = score;
-                bestMove = move;
+        // no score is below lowest or above highest - mates can't happen before the first ply
+        Score_t lowest = {0, -1, 0};
+        Score_t highest = {0, 1, 0};
+
+        MinimaxScore_t result = {};
+        bool completed = false;
+        double last_time = 0; // time taken by the last depth
+        for(uint8_t depth = 1; depth <= max_depth; depth++) {
+            double depth_start = elapsed();
+            Score_t score = _search(board, depth, 0, lowest, highest);
+            if(aborted) {
+                if(!completed && pvLength[0] > 0) { // use what was found of the first depth
+                    result.bestMove = pvTable[0][0];
+                    pv.assign(pvTable[0], pvTable[0] + pvLength[0]);
+                }
+                break;
             }
-            board.unmakeMove();
+            result.score = score.score;
+            result.mate_in = score.mate_in;
+            result.depth = depth;
+            result.bestMove = pvTable[0][0];
+            pv.assign(pvTable[0], pvTable[0] + pvLength[0]);
+            stats.depth = depth;
+            completed = true;
+
+            // a mate within the depth searched won't change by searching deeper
+            if(score.mate_in != 0 && abs(score.mate_in) <= depth) {
+                break;
+            }
+            // don't start a depth that isn't expected to finish - guess it grows from the last depth as the last did from the one before
+            double depth_time = elapsed() - depth_start;
+            if(time_limit > 0 && elapsed() + depth_time * (last_time > 0 ? max(depth_time / last_time, 2.0) : 20.0) > time_limit) {
+                break;
+            }
+            last_time = depth_time;
         }
-        assert(!firstIteration); // There should always be at least one move
+        if(pv.empty()) { // out of budget before any move was searched
+            MoveList moves;
+            board.legalMoves(moves);
+            result.bestMove = moves[0];
+            pv.push_back(moves[0]);
+        }
+        stats.time = elapsed();
+        return result;
+    }
 
-        /*
-            Build the final result
-        */
-        MinimaxScore_t minimaxScore;
-        minimaxScore.score = bestScore.score;
-        minimaxScore.mate_in = bestScore.mate_in;
-        minimaxScore.depth = bestScore.depth;
-        minimaxScore.bestMove = bestMove;
+private:
+
+    std::chrono::steady_clock::time_point start;
+    double time_limit;
+    uint64_t node_limit;
+    bool aborted;
+
+    // triangular table - pvTable[ply] holds the best line found from the position at ply
+    Move pvTable[MAX_SEARCH_PLY + 1][MAX_SEARCH_PLY + 1];
+    uint8_t pvLength[MAX_SEARCH_PLY + 1];
+
+    double elapsed() {
+        return std::chrono::duration<double>(std::chrono::steady_clock::now() - start).count();
+    }
+
+    void checkBudget() {
+        if((node_limit > 0 && stats.nodes >= node_limit) || (time_limit > 0 && elapsed() >= time_limit)) {
+            aborted = true;
+        }
+    }
+
+    // mates are stored counted from the position so they are still right when it is reached at another ply
+    static Score_t toTable(Score_t score, uint8_t ply) {
+        if(score.mate_in > 0) score.mate_in -= ply;
+        else if(score.mate_in < 0) score.mate_in += ply;
+        return score;
+    }
 
-        printf("Search stats: leafs %ld, moves %ld, evals %ld, table_lookups %ld\n", leaf_nodes, moves_generated, positions_evaled, table_lookups);
+    static Score_t fromTable(Score_t score, uint8_t ply) {
+        if(score.mate_in > 0) score.mate_in += ply;
+        else if(score.mate_in < 0) score.mate_in -= ply;
+        return score;
+    }
 
-        return minimaxScore;
+    // best move from the transposition table first, then captures of the most valuable pieces and promotions
+    void orderMoves(Board& board, MoveList& moves, uint16_t tableMove) {
+        auto order = [&board, tableMove](const Move& move) {
+            if(tableMove != 0 && move.pack() == tableMove) {
+                return 100;
+            }
+            int r = 0;
+            uint8_t victim = board.state->squares[move.to_square];
+            if(victim != 0) {
+                r = 10 + piece(victim);
+            } else if(move.move_type == MOVE_ENPASS) {
+                r = 10;
+            }
+            if(move.move_type == MOVE_PROMOTE) {
+                r += 5 + move.promotion_type;
+            }
+            return r;
+        };
+        stable_sort(moves.begin(), moves.end(), [&order](const Move& a, const Move& b) { return order(a) > order(b); });
     }
 
-    Score_t _search(Board& board, uint8_t depth) {
+    /*
+        Fail-soft alpha-beta search - scores are from white's point of view, white maximizes and black minimizes
+            returns a meaningless score once aborted
+    */
+    Score_t _search(Board& board, uint8_t depth, uint8_t ply, Score_t alpha, Score_t beta) {
+        pvLength[ply] = 0;
+        stats.nodes++;
+        if((stats.nodes & (BUDGET_CHECK_NODES - 1)) == 0) {
+            checkBudget();
+        }
+        if(aborted) {
+            return {0, 0, 0};
+        }
+
         /*
             Handle leaf nodes - game end, transposition table lookup, or depth limit
+            game end is only known once the legal moves have been generated - at the depth limit it's enough to
+            generate until the first legal move
         */
-        MoveGenerator fake_moves = board.legalMoves();
-        for(Move move : fake_moves) {}
+        MoveList moves;
+        if(depth == 0) {
+            board.gameEnd();
+        } else {
+            board.legalMoves(moves);
+            stats.moves_generated += moves.size();
+        }
         if(game_end(board.state->game_end_reason)) {
             uint8_t winner = winner(board.state->game_end_reason);
-            leaf_nodes++;
+            stats.leaf_nodes++;
             if(winner == DRAW) {
                 return {0, 0, 0};
             } else if(winner == WHITE) {
-                return {0, (int8_t)(search_depth - depth), 0};
+                return {0, (int8_t)ply, 0};
             } else if(winner == BLACK) {
-                return {0, (int8_t)(-(search_depth - depth)), 0};
+                return {0, (int8_t)(-ply), 0};
             }
             assert(false);
+        }
 
-        } else if(table.contains(board.state->zobrist)) {
-            Score_t score = table.get(board.state->zobrist);
-            if(score.depth >= depth) {
-                table_lookups++;
+        uint64_t key = board.state->zobrist;
+        uint16_t tableMove = 0;
+        if(table.contains(key)) {
+            TableEntry_t entry = table.get(key);
+            tableMove = entry.bestMove;
+            Score_t score = fromTable(entry.score, ply);
+            if(ply > 0 && score.depth >= depth && (entry.bound == BOUND_EXACT ||
+                    (entry.bound == BOUND_LOWER && !(score < beta)) ||
+                    (entry.bound == BOUND_UPPER && !(alpha < score)))) {
+                stats.table_lookups++;
                 return score;
             }
-        } else if(depth == 0) {
-            positions_evaled++;
+        }
+
+        if(depth == 0) {
+            stats.positions_evaled++;
             return {eval(board), 0, 0};
         }
 
@@ -166,33 +298,49 @@ public:
             Search the tree
         */
         bool maxing = board.state->turn == WHITE;
+        Score_t original_alpha = alpha;
+        Score_t original_beta = beta;
         Score_t bestScore;
-        MoveGenerator moves = board.legalMoves();
-        // printf("%s\n", board.get_fen().c_str());
+        Move bestMove;
+        orderMoves(board, moves, tableMove);
         bool firstIteration = true;
         for(Move move : moves) {
-            moves_generated++;
-            // printf("makeMove :");
-            // move.print();
             board.makeMove(move);
-            Score_t score = _search(board, depth - 1);
-            if(firstIteration) {
+            Score_t score = _search(board, depth - 1, ply + 1, alpha, beta);
+            board.unmakeMove();
+            if(aborted) {
+                return {0, 0, 0};
+            }
+            if(firstIteration || (maxing && score > bestScore) || (!maxing && score < bestScore)) {
                 bestScore = score;
+                bestMove = move;
                 firstIteration = false;
-            } else if((maxing && score > bestScore) || (!maxing && score < bestScore)) {
-                bestScore = score;
+
+                pvTable[ply][0] = move;
+                memcpy(&pvTable[ply][1], pvTable[ply + 1], pvLength[ply + 1] * sizeof(Move));
+                pvLength[ply] = pvLength[ply + 1] + 1;
+
+                if(maxing && alpha < bestScore) {
+                    alpha = bestScore;
+                } else if(!maxing && bestScore < beta) {
+                    beta = bestScore;
+                }
+                if(!(alpha < beta)) {
+                    stats.cutoffs++;
+                    break;
+                }
             }
-            // printf("unMove   :");
-            // move.print();
-            board.unmakeMove();
-        }
-        if(firstIteration) {
-            printf("No moves found\n");
-            printf("game end = %d\n", game_end(board.state->game_end_reason));
         }
         assert(!firstIteration); // There should always be at least one move
-        bestScore.depth++;
-        table.set(board.state->zobrist, bestScore);
+
+        uint8_t bound = BOUND_EXACT;
+        if(!(original_alpha < bestScore)) {
+            bound = BOUND_UPPER;
+        } else if(!(bestScore < original_beta)) {
+            bound = BOUND_LOWER;
+        }
+        bestScore.depth = depth;
+        table.set(key, {toTable(bestScore, ply), bound, bestMove.pack()});
         return bestScore;
     }
 
@@ -201,14 +349,14 @@ public:
 /*
     Implementation of Minimax which evaluates the point value of the pieces on the board
 */
-class MinimaxMaterial : public Minimax<uint16_t> {
+class MinimaxMaterial : public Minimax<int16_t> {
 public:
-    MinimaxMaterial() : Minimax<uint16_t>() {}
-    MinimaxMaterial(size_t capacity) : Minimax<uint16_t>(capacity) {}
+    MinimaxMaterial() : Minimax<int16_t>() {}
+    MinimaxMaterial(size_t capacity) : Minimax<int16_t>(capacity) {}
 
-    uint16_t eval(Board& board) {
+    int16_t eval(Board& board) {
         Composition comp = board.state->composition;
-        uint16_t score = 0;
+        int16_t score = 0;
         score += comp.getNumPieces(WHITE | PAWN);
         score += comp.getNumPieces(WHITE | KNIGHT) * 3;
         score += comp.getNumPieces(WHITE | BISHOP) * 3;
@@ -4,7 +4,6 @@
 #include <string>
 
 #include "board.h"
-#include "attack-squares.h"
 
 using namespace std;
 
@@ -31,6 +30,38 @@ Move::Move(string uci) {
 	}
 }
 
+string Move::uci() const {
+	string res(square_names[from_square]);
+	res += square_names[to_square];
+	if(move_type == MOVE_PROMOTE) {
+		if     (promotion_type == QUEEN)  res += 'q';
+		else if(promotion_type == ROOK)   res += 'r';
+		else if(promotion_type == BISHOP) res += 'b';
+		else if(promotion_type == KNIGHT) res += 'n';
+	}
+	return res;
+}
+
+uint16_t Move::pack() const {
+	uint16_t packed = from_square | (to_square << 6);
+	if(move_type == MOVE_PROMOTE) {
+		packed |= (promotion_type + 1) << 12;
+	}
+	return packed;
+}
+
+Move Move::unpack(uint16_t packed, Board& board) {
+	uint8_t from = packed & 63;
+	uint8_t to = (packed >> 6) & 63;
+	uint8_t promotion = (packed >> 12) & 7;
+	if(promotion != 0) {
+		return Move(from, to, MOVE_PROMOTE, promotion - 1);
+	}
+	Move move(from, to, MOVE_NO_CONTEXT, 0);
+	move.build_context(board);
+	return move;
+}
+
 void Move::build_context(Board& board) {
 	
 	// check if context already exists
@@ -4,14 +4,10 @@
 #include <stdint.h>
 #include <stdio.h>
 #include <string>
+#include <assert.h>
 
 struct Move;
 #include "board.h"
-#include "generator.h"
-
-// Type used by functions generating lists of moves to implement coroutines
-typedef Generator<Move> MoveGenerator;
-
 
 #include <execinfo.h>
 #include <stdio.h>
@@ -23,6 +19,8 @@ using namespace std;
 #define MOVE_PROMOTE 3
 #define MOVE_NO_CONTEXT 4
 
+#define MAX_MOVES 256 // no position has more than 218 legal moves
+
 struct Move {
 	uint8_t from_square;
 	uint8_t to_square;
@@ -46,13 +44,21 @@ struct Move {
 	
 	Move(string uci);
 
-	// Default constructor so vector<move>.resize will work
-	// Also used by classes which should maybe use optional 
-	// values like Generator::Promise
+	// Default constructor so vector<move>.resize and MoveList will work
 	Move() {};
 
 	void build_context(Board& board);
 
+	// returns the move in uci notation ie. "e2e4" or "e7e8q"
+	string uci() const;
+
+	/*
+		Packed moves are 16 bits - <promotion>[14:12] <to_square>[11:6] <from_square>[5:0]
+		promotion is 0 for none, otherwise the promoted piece + 1 so it matches python-chess piece types
+	*/
+	uint16_t pack() const;
+	static Move unpack(uint16_t packed, Board& board);
+
 	bool operator==(const Move& other) {
 		if(from_square != other.from_square || to_square != other.to_square || move_type != other.move_type)
 			return false;
@@ -66,4 +72,24 @@ struct Move {
 		if(move_type  == MOVE_NORMAL) printf("<Move %s-%s>\n", square_names[from_square], square_names[to_square]);
 		else printf("<Move %s-%s (%s, %d)>\n", square_names[from_square], square_names[to_square], type_str[move_type], _special_val);
 	}
-};
\ No newline at end of file
+};
+
+/*
+	Fixed capacity list of moves filled by Board::legalMoves - meant to be put on the stack
+	so generating moves doesn't allocate
+*/
+struct MoveList {
+	Move moves[MAX_MOVES];
+	int count = 0;
+
+	void push(Move move) {
+		assert(count < MAX_MOVES);
+		moves[count++] = move;
+	}
+
+	int size() const { return count; }
+	bool empty() const { return count == 0; }
+	Move& operator[](int i) { return moves[i]; }
+	Move* begin() { return moves; }
+	Move* end() { return moves + count; }
+};
@@ -50,6 +50,19 @@ def py_search(board, depth) :
 	return count
 
 
+# prints the moves whose perft counts differ between the cpp board and python-chess - one call into the library
+def print_divide_mismatches(fen, depth) :
+	divide = Board(fen).perft_divide(depth)
+	py_board = PyBoard(fen)
+	expected = {}
+	for move in py_board.legal_moves :
+		py_board.push(move)
+		expected[move] = py_search(py_board, depth - 1)
+		py_board.pop()
+	for move in sorted(set(divide) | set(expected), key=lambda m : m.uci()) :
+		if divide.get(move) != expected.get(move) :
+			print(f"\t{move.uci()}: actual = {divide.get(move)}, expected = {expected.get(move)}")
+
 def pretty_print_tests() :
 	# True for cpp board - false for Python board
 	use_cpp_board = True
@@ -70,6 +83,8 @@ def pretty_print_tests() :
 				print(f"depth {d} FAILED ({round(total, 2)}s)")
 				print(f"\tactual = {actual}")
 				print(f"\texpected = {ans}")
+				if use_cpp_board and d > 0 and d <= 4 :
+					print_divide_mismatches(test, d)
 				failed += 1
 				break
 		print()
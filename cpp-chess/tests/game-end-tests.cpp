@@ -94,7 +94,9 @@ void run_game_end_tests(string filename) {
 		// check moves and get to end position
 		for(Move move : test.moves) {
 			move.build_context(board);
-			vector<Move> legal_moves = board.legalMoves().to_vector();
+			MoveList move_list;
+			board.legalMoves(move_list);
+			vector<Move> legal_moves(move_list.begin(), move_list.end());
 			if(find(legal_moves.begin(), legal_moves.end(), move) == legal_moves.end()) { // Expected move is not found
 				// check if this is because of disagreement on lone king vs 2 knights case
 				if (is_edge_case_draw(board)) {
@@ -133,7 +135,10 @@ void run_game_end_tests(string filename) {
 			board.setGameEndReason();
 			board.makeMove(move);
 		}
-		for(Move m : board.legalMoves()) {} // iteratre through the entire routine so end reason actually gets set
+		{
+			MoveList move_list;
+			board.legalMoves(move_list); // generate every move so end reason actually gets set
+		}
 		legalMovesEndReason = board.state->game_end_reason;
 		board.setGameEndReason();
 		setGameEndReasonEndReason = board.state->game_end_reason;
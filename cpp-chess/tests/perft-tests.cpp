@@ -74,9 +74,10 @@ void run_pert_tests() {
 //////// Statistics variables
 //////////////////////////////
 
-uint64_t num_hits = 0;
-uint64_t num_skips = 0;
-uint64_t num_gen_moves = 0;
+// thread local so count_positions can run on several boards at once
+thread_local uint64_t num_hits = 0;
+thread_local uint64_t num_skips = 0;
+thread_local uint64_t num_gen_moves = 0;
 
 //////////////////////////////
 //////// Perft Counting (NO TRANPOSITION)
@@ -105,11 +106,14 @@ uint64_t _countPositions(Board& board, uint64_t depth) {
 	if(depth == 0) {
 		return 1;
 	} else if(depth == 1) {
-		count = board.legalMoves().size();
+		MoveList moves;
+		board.legalMoves(moves);
+		count = moves.size();
 		num_gen_moves += 1;
 		return count;
 	}
-	MoveGenerator moves = board.legalMoves();
+	MoveList moves;
+	board.legalMoves(moves);
 	num_gen_moves += 1;
 	for(Move move : moves) {
 		board.makeMove(move);
@@ -161,12 +165,15 @@ uint64_t countPositionsZobristTransTable(Board& board, uint64_t depth, vector<Tr
 	if(depth == 0) {
 		return 1;
 	} else if(depth == 1) {
-		count = board.legalMoves().size();
+		MoveList moves;
+		board.legalMoves(moves);
+		count = moves.size();
 		num_gen_moves += 1;
 		tables[depth-1].set(board.state->zobrist, count);
 		return count;
 	}
-	MoveGenerator moves = board.legalMoves();
+	MoveList moves;
+	board.legalMoves(moves);
 	num_gen_moves += 1;
 	for(Move move : moves) {
 		board.makeMove(move);
@@ -234,12 +241,15 @@ uint64_t countPositionsFenLru(Board& board, uint64_t depth, lru_cache<string, ui
 	if(depth == 0) {
 		return 1;
 	} else if(depth == 1) {
-		count = board.legalMoves().size();
+		MoveList moves;
+		board.legalMoves(moves);
+		count = moves.size();
 		num_gen_moves += 1;
 		lru.insert(fen, count);
 		return count;
 	}
-	MoveGenerator moves = board.legalMoves();
+	MoveList moves;
+	board.legalMoves(moves);
 	num_gen_moves += 1;
 	for(Move move : moves) {
 		board.makeMove(move);
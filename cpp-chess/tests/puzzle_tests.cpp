@@ -47,7 +47,8 @@ bool moves_equal(const Move& lhs, const Move& rhs) {
 }
 
 bool move_is_legal(Board& board, const Move& target) {
-    MoveGenerator legal = board.legalMoves();
+    MoveList legal;
+    board.legalMoves(legal);
     for(Move move : legal) {
         if(moves_equal(move, target)) {
             return true;